@@ -0,0 +1,209 @@
+# SPDX-FileCopyrightText: 2024 German Aerospace Center
+#
+# SPDX-License-Identifier: Apache-2.0
+
+from collections.abc import Hashable
+
+import numpy as np
+import pandas as pd
+
+
+class Codes:
+    """Dense integer codes of keys, e.g. agent ids or technologies, assigned in order of their first appearance"""
+
+    def __init__(self) -> None:
+        self.keys = pd.Index([])
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def encode(self, keys: np.ndarray | pd.Series) -> np.ndarray:
+        """Returns the codes of given keys - new keys are assigned the next free codes"""
+        codes, uniques = pd.factorize(keys)
+        uniques = pd.Index(uniques)
+        if not len(self.keys):
+            self.keys = pd.Index(uniques)
+        else:
+            self.keys = self.keys.append(uniques.difference(self.keys, sort=False))
+        # missing keys keep the code -1
+        return np.where(codes < 0, -1, self.keys.get_indexer(uniques)[codes])
+
+
+def hour_offsets(
+    time_steps: pd.Series, origin: pd.Timestamp, time_format: str
+) -> np.ndarray:
+    """
+    Returns the number of full hours between `origin` and each of the given time steps
+
+    Args:
+        time_steps: as text, e.g. "2019-01-01_00:15:00"
+        origin: full hour with offset 0
+        time_format: of the time steps, e.g. "%Y-%m-%d_%H:%M:%S"
+
+    Returns:
+        hour offset of each time step
+    """
+    # time steps repeat for every agent, thus only the distinct ones are parsed
+    codes, uniques = pd.factorize(time_steps)
+    times = pd.to_datetime(pd.Index(uniques), format=time_format)
+    return ((times - origin) // pd.Timedelta(hours=1)).to_numpy()[codes]
+
+
+def scatter_sum(
+    rows: np.ndarray, columns: np.ndarray, weights: np.ndarray | None, shape
+) -> np.ndarray:
+    """Returns a matrix of given `shape` holding the sum of the `weights` at their rows and columns - or their count"""
+    flat = rows * shape[1] + columns
+    return np.bincount(flat, weights=weights, minlength=shape[0] * shape[1]).reshape(
+        shape
+    )
+
+
+class HourlyMatrix:
+    """
+    Sums and counts of values per hour and key, accumulated chunk by chunk into dense matrices of shape
+    (values, hours, keys). Keys are encoded as integer columns and time steps as hour offsets, so that each chunk is
+    added by scatter-adds per value instead of grouping by timestamp and key. Each value is counted on its own, as
+    AMIRIS writes different columns at different time steps and leaves the others empty.
+    """
+
+    def __init__(
+        self, values: list[str], time_format: str = "%Y-%m-%d_%H:%M:%S"
+    ) -> None:
+        """
+        Args:
+            values: names of the accumulated values
+            time_format: of the time steps
+        """
+        self._values = values
+        self._time_format = time_format
+        self._origin: pd.Timestamp | None = None
+        self._keys = Codes()
+        self._counts = np.zeros((len(values), 0, 0))
+        self._sums = np.zeros((len(values), 0, 0))
+
+    def add(self, time_steps: pd.Series, keys: pd.Series, values: np.ndarray) -> None:
+        """
+        Adds given rows to the sums and counts of their hour and key
+
+        Args:
+            time_steps: of the rows as text
+            keys: of the rows, e.g. agent ids
+            values: of the rows with one column per accumulated value
+        """
+        if self._origin is None:
+            first = pd.to_datetime(time_steps.iloc[0], format=self._time_format)
+            self._origin = first.floor("h")
+        hours = hour_offsets(time_steps, self._origin, self._time_format)
+        columns = self._keys.encode(keys)
+        earliest = hours.min()
+        if earliest < 0:
+            # rows before the origin move the origin back
+            self._grow(before=-earliest)
+            hours -= earliest
+        self._grow(hours=hours.max() + 1, keys=len(self._keys))
+
+        shape = self._counts.shape[1:]
+        for i in range(len(self._values)):
+            # empty cells are neither summed nor counted, as NaN would spoil the sum of their whole hour
+            valid = ~np.isnan(values[:, i])
+            weights = np.where(valid, values[:, i], 0)
+            self._counts[i] += scatter_sum(hours[valid], columns[valid], None, shape)
+            self._sums[i] += scatter_sum(hours, columns, weights, shape)
+
+    def _grow(self, hours: int = 0, keys: int = 0, before: int = 0) -> None:
+        """Extends the matrices to at least given numbers of hours and keys, or by `before` hours ahead of the origin"""
+        hours = max(hours, self._counts.shape[1])
+        keys = max(keys, self._counts.shape[2])
+        if before:
+            self._origin -= pd.Timedelta(hours=before)
+        padding = (
+            (before, hours - self._counts.shape[1]),
+            (0, keys - self._counts.shape[2]),
+        )
+        if any(sum(pad) for pad in padding):
+            self._counts = np.pad(self._counts, ((0, 0), *padding))
+            self._sums = np.pad(self._sums, ((0, 0), *padding))
+
+    def _timestamps(self) -> pd.Index:
+        """Returns the time stamps of all hours of the matrices, e.g. "2019-01-01 00h" - formatted once per hour"""
+        times = self._origin + pd.to_timedelta(
+            np.arange(self._counts.shape[1]), unit="h"
+        )
+        return pd.Index(times.strftime("%Y-%m-%d %Hh"))
+
+    @staticmethod
+    def _frame(
+        values: dict[str, np.ndarray],
+        present: np.ndarray,
+        timestamps: pd.Index,
+        keys: pd.Index,
+        name: str | None,
+    ) -> pd.DataFrame:
+        """Returns the `values` of shape (hours, keys) at the `present` cells, indexed by "TimeStamp" and `name`"""
+        # columns are sorted by their key, so that the rows are ordered as if grouped by time stamp and key
+        order = np.argsort(keys)
+        hours, columns = np.nonzero(present[:, order])
+        index = pd.MultiIndex(
+            levels=[timestamps, keys[order]],
+            codes=[hours, columns],
+            names=["TimeStamp", name],
+        )
+        return pd.DataFrame(
+            {
+                column: matrix[:, order][hours, columns]
+                for column, matrix in values.items()
+            },
+            index=index,
+        )
+
+    def _means(self) -> np.ndarray:
+        """Returns the means of the values of shape (values, hours, keys) - NaN where a value has no count"""
+        return np.divide(
+            self._sums,
+            self._counts,
+            out=np.full_like(self._sums, np.nan),
+            where=self._counts > 0,
+        )
+
+    def means(self) -> pd.DataFrame:
+        """
+        Returns the mean values of all hours and keys with at least one value, indexed by "TimeStamp" and "AgentId" -
+        NaN for values without any in their hour, as of `groupby(...).mean()`
+        """
+        return self._frame(
+            dict(zip(self._values, self._means())),
+            (self._counts > 0).any(axis=0),
+            self._timestamps(),
+            self._keys.keys,
+            "AgentId",
+        )
+
+    def group_sums(self, groups: dict[Hashable, str]) -> pd.DataFrame:
+        """
+        Returns the sums of the mean values of the keys in each group per hour
+
+        Args:
+            groups: name of the group of each key - keys without group are omitted
+
+        Returns:
+            sums of all hours and groups with at least one value, indexed by "TimeStamp" and the group name
+        """
+        names = Codes()
+        group_codes = names.encode(
+            pd.Series([groups.get(key) for key in self._keys.keys], dtype=object)
+        )
+        # keys without group are encoded as -1 and get no column in the one-hot matrix
+        membership = np.zeros((len(self._keys), len(names)))
+        valid = group_codes >= 0
+        membership[np.flatnonzero(valid), group_codes[valid]] = 1
+        present = (self._counts > 0).any(axis=0)
+        # keys without a value in an hour are skipped, as by `groupby(...).sum()`
+        means = np.nan_to_num(self._means())
+        return self._frame(
+            dict(zip(self._values, means @ membership)),
+            (present @ membership) > 0,
+            self._timestamps(),
+            names.keys,
+            None,
+        )
@@ -0,0 +1,214 @@
+# SPDX-FileCopyrightText: 2024 German Aerospace Center
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import time
+from pathlib import Path
+
+import pandas as pd
+import yaml
+
+from dashboard.data import Column, Model
+from dashboard.data.aggregation import HourlyMatrix
+from dashboard.data.preparation import DataPreparer
+
+# rows of an output file parsed at once
+CHUNK_SIZE = 500_000
+# technologies of renewable operators by their `EnergyCarrier` attribute
+ENERGY_CARRIERS = {
+    "PV": Column.PV,
+    "WindOn": Column.ONSHORE,
+    "WindOff": Column.OFFSHORE,
+    "RunOfRiver": Column.HYDRO,
+}
+# technologies of conventional operators by the `FuelType` of the plant builder they are supplied by
+FUEL_TYPES = {
+    "NUCLEAR": Column.NUCLEAR,
+    "LIGNITE": Column.LIGNITE,
+    "HARD_COAL": Column.COAL,
+    "NATURAL_GAS": Column.GAS,
+    "OIL": Column.OIL,
+}
+
+
+class _ScenarioLoader(yaml.SafeLoader):
+    """Loads AMIRIS scenario files, resolving their `!include` tags relative to the including file"""
+
+
+def _include(loader: _ScenarioLoader, node: yaml.Node):
+    """Returns the content of the files matching an `!include "pattern"` or `!include ["pattern", "key"]` tag"""
+    if isinstance(node, yaml.SequenceNode):
+        pattern, *key = loader.construct_sequence(node)
+    else:
+        pattern, key = loader.construct_scalar(node), []
+    contents = []
+    for path in sorted(Path(loader.name).parent.glob(pattern)):
+        content = load_scenario(path)
+        contents.append(content[key[0]] if key else content)
+    if len(contents) == 1:
+        return contents[0]
+    return [item for content in contents for item in content]
+
+
+_ScenarioLoader.add_constructor("!include", _include)
+
+
+def load_scenario(path: Path) -> dict:
+    """Returns the content of the AMIRIS scenario file at given `path` with all its included files"""
+    with open(path, encoding="utf8") as file:
+        return yaml.load(file, Loader=_ScenarioLoader)
+
+
+def _agent_pairs(contract: dict) -> list[tuple[int, int]]:
+    """Returns the pairs of sender and receiver of a contract, whose ids may be single ids or lists of equal length"""
+    senders, receivers = contract["SenderId"], contract["ReceiverId"]
+    if not isinstance(senders, list):
+        senders = [senders] * (len(receivers) if isinstance(receivers, list) else 1)
+    if not isinstance(receivers, list):
+        receivers = [receivers] * len(senders)
+    return list(zip(senders, receivers))
+
+
+def agent_columns(scenario: dict) -> dict[int, Column]:
+    """
+    Returns the dispatch column of each renewable and conventional operator agent of given scenario
+
+    Args:
+        scenario: content of an AMIRIS scenario file as returned by `load_scenario`
+
+    Returns:
+        column by agent id - agents of technologies without column, e.g. biogas, are omitted
+    """
+    agents = {agent["Id"]: agent for agent in scenario["Agents"]}
+    columns = {}
+    for agent_id, agent in agents.items():
+        carrier = agent.get("Attributes", {}).get("EnergyCarrier")
+        if agent["Type"] == "VariableRenewableOperator" and carrier in ENERGY_CARRIERS:
+            columns[agent_id] = ENERGY_CARRIERS[carrier]
+    for contract in scenario.get("Contracts", []):
+        for sender, receiver in _agent_pairs(contract):
+            builder, operator = agents.get(sender, {}), agents.get(receiver, {})
+            if (
+                builder.get("Type") == "PredefinedPlantBuilder"
+                and operator.get("Type") == "ConventionalPlantOperator"
+            ):
+                fuel = builder["Attributes"]["Prototype"]["FuelType"]
+                columns[receiver] = FUEL_TYPES[fuel]
+    return columns
+
+
+def hourly_means(
+    path: Path,
+    values: list[str],
+    technologies: dict[int, Column] | None = None,
+    chunksize: int = CHUNK_SIZE,
+) -> pd.DataFrame:
+    """
+    Streams given AMIRIS output file in chunks and averages its `values` per hour and agent, skipping empty cells as
+    `groupby(...).mean()` does. Memory is bounded by the chunk size and the number of hours and agents, but independent
+    of the size of the file.
+
+    Args:
+        path: of the semicolon-separated output file with columns "TimeStep" and "AgentId"
+        values: names of the columns to average
+        technologies: if given, the means of the agents are summed per technology - agents without are omitted
+        chunksize: number of rows parsed at once
+
+    Returns:
+        averaged values with index "TimeStamp" and "AgentId" - or the name of the technology column if given
+    """
+    # the chunks are accumulated into matrices of hours and agents, which only grow with the simulated period
+    start = time.perf_counter()
+    matrix, rows = HourlyMatrix(values), 0
+    with pd.read_csv(
+        path,
+        sep=";",
+        usecols=["TimeStep", "AgentId", *values],
+        dtype={"TimeStep": str, "AgentId": "int64"} | dict.fromkeys(values, "float64"),
+        chunksize=chunksize,
+    ) as reader:
+        for chunk in reader:
+            rows += len(chunk)
+            matrix.add(chunk["TimeStep"], chunk["AgentId"], chunk[values].to_numpy())
+    duration = time.perf_counter() - start
+    size = path.stat().st_size / 1e6
+    print(
+        f"  {path.name:<40} {rows:>10} rows {rows / duration:>12,.0f} rows/s {size / duration:>8.1f} MB/s"
+    )
+    if technologies is None:
+        return matrix.means()
+    return matrix.group_sums(
+        {agent: column.name for agent, column in technologies.items()}
+    )
+
+
+class AmirisOutputs:
+    """Hourly dispatch per technology and prices aggregated directly from the output files of AMIRIS runs"""
+
+    DISPATCH = "AwardedEnergyInMWH"
+    PRICE = "ElectricityPriceInEURperMWH"
+    DISCHARGE = "AwardedDischargeEnergyInMWH"
+    CHARGE = "AwardedChargeEnergyInMWH"
+
+    def __init__(
+        self, output_folder: Path, scenario_folder: Path, country: str = "Germany"
+    ) -> None:
+        """
+        Args:
+            output_folder: with one output folder per scenario, e.g. "scenario" for "scenario/Germany2019/*.csv"
+            scenario_folder: with one folder per scenario holding its scenario.yaml, e.g. "../amiris-examples"
+            country: prefix of the scenario names, which end with their year, e.g. "Germany" for "Germany2019"
+        """
+        self._output_folder = output_folder
+        self._scenario_folder = scenario_folder
+        self._country = country
+        self._data: dict[int, pd.DataFrame] = {}
+
+    def has_data_for_year(self, year: int) -> bool:
+        """Returns True if data for the given `year` is available"""
+        return year in self._data.keys()
+
+    def read(self, year: int) -> None:
+        """Aggregates the outputs of the scenario of given `year` to one column per technology and the price"""
+        scenario = f"{self._country}{year}"
+        outputs = Path(self._output_folder, scenario)
+        columns = agent_columns(
+            load_scenario(Path(self._scenario_folder, scenario, "scenario.yaml"))
+        )
+
+        dispatch = [
+            hourly_means(Path(outputs, f"{file}.csv"), [self.DISPATCH], columns)
+            for file in ["VariableRenewableOperator", "ConventionalPlantOperator"]
+        ]
+        data = (
+            pd.concat(dispatch)[self.DISPATCH]
+            .groupby(level=[0, 1])
+            .sum()
+            .unstack(fill_value=0)
+        )
+
+        storage = hourly_means(
+            Path(outputs, "StorageTrader.csv"), [self.DISCHARGE, self.CHARGE]
+        )
+        net_discharge = storage[self.DISCHARGE] - storage[self.CHARGE]
+        data[Column.STORAGE.name] = net_discharge.groupby("TimeStamp").sum()
+        prices = hourly_means(
+            Path(outputs, "DayAheadMarketSingleZone.csv"), [self.PRICE]
+        )
+        data[Column.PRICE.name] = prices[self.PRICE].groupby("TimeStamp").mean()
+        # technologies without operator in the scenario have no dispatch at all
+        technologies = [
+            column.name for column in [*ENERGY_CARRIERS.values(), *FUEL_TYPES.values()]
+        ]
+        self._data[year] = data.reindex(
+            columns=[*technologies, Column.STORAGE.name, Column.PRICE.name]
+        ).fillna({technology: 0 for technology in technologies})
+
+    def add_column(
+        self, preparer: DataPreparer, group: str, year: int, column: Column
+    ) -> None:
+        """Adds data for given `column` and `year` to specified `group` of given `preparer`"""
+        if year not in self._data.keys():
+            raise ValueError(f"Outputs not read for year {year} of {self._country}")
+        series = self._data[year][column.name].rename(Model.AMIRIS.name)
+        preparer.add_values(group=group, series=series, metadata=column.value)
@@ -87,6 +87,14 @@ FILES = {
             separator=",",
             columns={Column.OFFSHORE: "AMIRIS"},
         ),
+        "Storage": CsvFile(
+            model=Model.AMIRIS,
+            file="dispatch_storage.csv",
+            time_column="time",
+            time_format=TimeFormat.UTC,
+            separator=",",
+            columns={Column.STORAGE: "AMIRIS"},
+        ),
     },
     Model.ASSUME: {
         "MarketMeta": CsvFile(
@@ -169,6 +177,14 @@ FILES = {
             separator=",",
             columns={Column.OFFSHORE: "ASSUME"},
         ),
+        "Storage": CsvFile(
+            model=Model.ASSUME,
+            file="dispatch_storage.csv",
+            time_column="time",
+            time_format=TimeFormat.UTC,
+            separator=",",
+            columns={Column.STORAGE: "ASSUME"},
+        ),
     },
     Model.HISTORICAL: {
         "DaPrices": CsvFile(
@@ -2,27 +2,108 @@
 #
 # SPDX-License-Identifier: Apache-2.0
 
+import hashlib
 import json
 import pathlib as pt
+import threading
 
 import pandas as pd
 
+from dashboard.data.preparation import (
+    DURATION_CURVES_KEY,
+    METRICS_KEY,
+    split_partition_key,
+)
+
 
 def get_meta(store: object, hdfpackage_path: str) -> dict:
     return json.loads(store.get_storer(hdfpackage_path).attrs["plot_metadata"])
 
 
-def load_data(path: pt.Path) -> dict:
-    datasets = {}
-    metadata = {}
+def get_hash(store: object, hdfpackage_path: str) -> str | None:
+    attrs = store.get_storer(hdfpackage_path).attrs
+    return attrs["data_hash"] if "data_hash" in attrs else None
+
+
+class PartitionedData:
+    """Lazy access to the year-partitioned data groups of an hdf5 store"""
+
+    # the hdf5 library is not thread-safe, thus partitions are read by one thread at a time
+    _read_lock = threading.Lock()
+
+    def __init__(self, path: pt.Path | None) -> None:
+        """
+        Indexes the partitions found in the store at given `path` without loading any of their data
+
+        Args:
+            path: of the hdf5 store - if missing, no groups are available
+        """
+        self._path = path
+        self._partitions: dict[str, dict[int, str]] = {}
+        self._hashes: dict[str, str] = {}
+        self.metadata: dict[str, dict] = {}
+        # error metrics per group, year and model, as computed during preprocessing - small enough to load at once
+        self.metrics = pd.DataFrame()
+        # sorted and downsampled values per group, year and model, as computed during preprocessing
+        self.duration_curves = pd.DataFrame()
+
+        if path is not None and path.exists():
+            with pd.HDFStore(path=path, mode="r") as store:
+                if f"/{METRICS_KEY}" in store.keys():
+                    self.metrics = store.get(METRICS_KEY)
+                if f"/{DURATION_CURVES_KEY}" in store.keys():
+                    self.duration_curves = store.get(DURATION_CURVES_KEY)
+                for key in sorted(store.keys()):
+                    group, year = split_partition_key(key)
+                    if year is None:
+                        continue
+                    self._partitions.setdefault(group, {})[year] = key
+                    self._hashes[key] = get_hash(store, key) or self._file_stamp()
+                    if group not in self.metadata:
+                        self.metadata[group] = get_meta(store, key)
+
+    @property
+    def groups(self) -> list[str]:
+        """Returns names of all available groups"""
+        return list(self._partitions.keys())
+
+    def years(self, group: str) -> list[int]:
+        """Returns all years with a partition of given `group` in ascending order"""
+        return sorted(self._partitions.get(group, {}).keys())
+
+    def fingerprint(self, group: str, years: list[int]) -> str:
+        """Returns a hash of the content of the partitions of given `group` for the given `years`"""
+        partitions = self._partitions.get(group, {})
+        content = hashlib.sha256()
+        for year in sorted(years):
+            if year in partitions:
+                content.update(self._hashes[partitions[year]].encode("utf8"))
+        return content.hexdigest()
+
+    def _file_stamp(self) -> str:
+        """Returns a stamp of the store file for partitions written without content hash"""
+        stat = self._path.stat()
+        return f"{stat.st_size}-{stat.st_mtime_ns}"
+
+    def get(self, group: str, years: list[int]) -> pd.DataFrame:
+        """
+        Loads and concatenates the partitions of given `group` for the given `years` only
+
+        Args:
+            group: to load data for
+            years: whose partitions are loaded - years without partition are ignored
+
+        Returns:
+            data of the selected partitions in order of their years
+        """
+        partitions = self._partitions.get(group, {})
+        keys = [partitions[year] for year in sorted(years) if year in partitions]
+        if not keys:
+            return pd.DataFrame()
+        with self._read_lock, pd.HDFStore(path=self._path, mode="r") as store:
+            return pd.concat([store.get(key) for key in keys])
 
-    if path is not None and path.exists():
-        with pd.HDFStore(path=path, mode="r") as store:
-            for key in store:
-                datasets[key] = store.get(key)
-                metadata[key] = get_meta(store, key)
-    else:
-        datasets = {}
-        metadata = {}
 
-    return datasets, metadata
+def load_data(path: pt.Path) -> tuple[PartitionedData, dict]:
+    data = PartitionedData(path)
+    return data, data.metadata
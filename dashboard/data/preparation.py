@@ -2,10 +2,20 @@
 #
 # SPDX-License-Identifier: Apache-2.0
 
+import hashlib
+import warnings
 from enum import Enum, auto
 from json import dumps
 
 import pandas as pd
+from tables import NaturalNameWarning
+
+from dashboard.tools.metrics import duration_curves, error_metrics
+
+# store key of the table of error metrics of all partitions
+METRICS_KEY = "metrics"
+# store key of the table of downsampled duration curves of all partitions
+DURATION_CURVES_KEY = "duration_curves"
 
 
 class DataPreparationException(Exception):
@@ -43,16 +53,60 @@ def column_metadata(label: str, unit: str = "") -> dict[Metadatum, str]:
     return {Metadatum.Label: str(label), Metadatum.Unit: str(unit)}
 
 
+def partition_key(group: str, year: int) -> str:
+    """
+    Returns the name of the data group holding the partition of given `group` for given `year`
+
+    Args:
+        group: name of the (unpartitioned) series group, e.g. "prices"
+        year: of the partition
+
+    Returns:
+        name of the partitioned group, e.g. "prices/2019"
+    """
+    return f"{group}/{year}"
+
+
+def split_partition_key(key: str) -> tuple[str, int | None]:
+    """
+    Splits a store key created by `partition_key` into its group and year
+
+    Args:
+        key: of a store entry, e.g. "/prices/2019"
+
+    Returns:
+        group name and year of the partition - year is None if the key is not year-partitioned
+    """
+    group, _, year = key.strip("/").rpartition("/")
+    if not group or not year.isdigit():
+        return key.strip("/"), None
+    return group, int(year)
+
+
 class DataPreparer:
     """Prepare data to be used in different types of plots"""
 
-    def __init__(self) -> None:
-        """Create a new DataPreparer"""
+    def __init__(
+        self,
+        metrics_reference: str | None = None,
+        duration_points: int | None = None,
+    ) -> None:
+        """
+        Create a new DataPreparer
+
+        Args:
+            metrics_reference: name of the column the other columns of each partition are compared to in the table of
+                error metrics saved with the data, e.g. "HISTORICAL" - if None, no metrics are saved
+            duration_points: number of points of the duration curves of all columns of each partition saved with the
+                data - if None, no duration curves are saved
+        """
         self.datasets: dict[str, dict[_Type, pd.DataFrame | dict]] = {}
+        self._metrics_reference = metrics_reference
+        self._duration_points = duration_points
 
     def save_to_file(self, out_file_path: str) -> None:
         """
-        Write all data to given file in hdf5 format
+        Write all data to given file in hdf5 format, with the tables of error metrics and duration curves if enabled
 
         Args:
             out_file_path: name of file to write
@@ -61,15 +115,54 @@ class DataPreparer:
             out_file_path = f"{out_file_path}.hdf5"
 
         store = pd.HDFStore(path=out_file_path, mode="w")
-        for key, item in self.datasets.items():
-            values = self._group_by_index(item[_Type.Data])
-            store.put(key=key, value=values)
-            metadata = self._convert_enums(item[_Type.Metadata])
-            store.get_storer(key=key).attrs.plot_metadata = dumps(
-                metadata, ensure_ascii=False
-            ).encode("utf8")
+        partitions, compared = {}, {}
+        with warnings.catch_warnings():
+            # year partitions like "prices/2019" are no valid python identifiers
+            warnings.simplefilter("ignore", NaturalNameWarning)
+            for key, item in self.datasets.items():
+                values = self._group_by_index(item[_Type.Data])
+                store.put(key=key, value=values)
+                metadata = self._convert_enums(item[_Type.Metadata])
+                attrs = store.get_storer(key=key).attrs
+                attrs.plot_metadata = dumps(metadata, ensure_ascii=False).encode("utf8")
+                attrs.data_hash = self._hash(values)
+                group, year = split_partition_key(key)
+                if year is None:
+                    continue
+                partitions[(group, year)] = values
+                if self._metrics_reference in values.columns:
+                    compared[(group, year)] = values
+        if compared:
+            store.put(key=METRICS_KEY, value=self._metrics(compared))
+        if partitions and self._duration_points is not None:
+            curves = duration_curves(
+                partitions, self._duration_points, ["group", "year"]
+            )
+            store.put(key=DURATION_CURVES_KEY, value=curves)
         store.close()
 
+    def _metrics(self, compared: dict[tuple[str, int], pd.DataFrame]) -> pd.DataFrame:
+        """
+        Returns the error metrics of all columns against the reference column of all given partitions, computed in one
+        vectorized pass
+
+        Args:
+            compared: data of each partition holding the reference column, by its group and year
+
+        Returns:
+            one row per group, year and column with the statistics of `dashboard.tools.metrics.METRICS`
+        """
+        return error_metrics(compared, self._metrics_reference, ["group", "year"])
+
+    @staticmethod
+    def _hash(data: pd.DataFrame) -> str:
+        """Returns a content hash of given data, its index and its column names"""
+        content = hashlib.sha256(
+            pd.util.hash_pandas_object(data, index=True).values.tobytes()
+        )
+        content.update(dumps(list(data.columns)).encode("utf8"))
+        return content.hexdigest()
+
     @staticmethod
     def _group_by_index(data: pd.DataFrame) -> pd.DataFrame:
         """
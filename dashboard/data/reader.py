@@ -5,11 +5,12 @@
 from pathlib import Path
 
 from dashboard.data import Column, Model
+from dashboard.data.amiris_outputs import AmirisOutputs
 from dashboard.data.files import FILES, CsvFile
 from dashboard.data.preparation import (
-    DataPreparationException,
     DataPreparer,
     column_metadata,
+    partition_key,
 )
 
 
@@ -20,9 +21,20 @@ class DataReader:
         self,
         preparer: DataPreparer,
         data_folder: Path,
+        models: tuple[Model, ...] = tuple(Model),
+        amiris_outputs: AmirisOutputs | None = None,
     ):
+        """
+        Args:
+            preparer: to save the data to
+            data_folder: with one folder of CSV files per year, e.g. "data/csv" for "data/csv/2019/preis_amiris.csv"
+            models: whose data are read
+            amiris_outputs: if given, AMIRIS data are aggregated from the AMIRIS output files instead of CSV files
+        """
         self._preparer = preparer
         self._folder = data_folder
+        self._models = models
+        self._amiris_outputs = amiris_outputs
         self._files_read: dict[Model, dict[str, CsvFile]] = {
             Model.AMIRIS: {},
             Model.ASSUME: {},
@@ -34,6 +46,9 @@ class DataReader:
         Read all timeseries for AMIRIS, ASSUME and historic data of given year and save to DataPreparer
         Args:
             year: to read the data for
+
+        Raises:
+            DataPreparationException: if data for given year were already read
         """
         self._populate(
             group="prices",
@@ -115,50 +130,59 @@ class DataReader:
             year=year,
             column=Column.OFFSHORE,
         )
+        self._populate(
+            group="storage",
+            amiris="Storage",
+            assume="Storage",
+            history=None,
+            year=year,
+            column=Column.STORAGE,
+        )
 
     def _populate(
         self,
         group: str,
         amiris: str,
         assume: str,
-        history: str,
+        history: str | None,
         year: int,
         column: Column,
     ) -> None:
         """
-        Create a new group for given column and assign series data from files for AMIRIS, ASSUME and historical data
+        Create a new group partition for given column and year and assign series data from files for AMIRIS, ASSUME and
+        historical data
 
         Args:
-            group: name of series group to be created
+            group: name of series group whose partition for `year` is to be created
             amiris: name of AMIRIS file that contains data of assigned column
             assume: name of ASSUME file that contains data of assigned column
-            history: name of historical file that contains data of assigned column
+            history: name of historical file that contains data of assigned column - None if there is none
             year: target year to extract data for
             column: target column to extract data for
         """
-        try:
-            self._preparer.init_data_group(
-                group=group,
-                key_metadata={
-                    "TimeStamp": column_metadata(label="Simulation Time", unit="h"),
-                },
-            )
-        except DataPreparationException:
-            # if group was added for different year
-            # we do not raise on duplicate group creation
-            pass
-        self._get_file(Model.AMIRIS, amiris, year).add_column(
-            self._preparer, group, year, column
-        )
-        self._get_file(Model.ASSUME, assume, year).add_column(
-            self._preparer, group, year, column
-        )
-        self._get_file(Model.HISTORICAL, history, year).add_column(
-            self._preparer, group, year, column
+        group = partition_key(group, year)
+        self._preparer.init_data_group(
+            group=group,
+            key_metadata={
+                "TimeStamp": column_metadata(label="Simulation Time", unit="h"),
+            },
         )
+        files = {Model.AMIRIS: amiris, Model.ASSUME: assume, Model.HISTORICAL: history}
+        for model in self._models:
+            if files[model] is not None:
+                self._get_file(model, files[model], year).add_column(
+                    self._preparer, group, year, column
+                )
 
-    def _get_file(self, model: Model, file_id: str, year: int) -> CsvFile:
+    def _get_file(
+        self, model: Model, file_id: str, year: int
+    ) -> CsvFile | AmirisOutputs:
         """Return file for the given `model` and `file_id` that has the data loaded for the given `year`"""
+        if model is Model.AMIRIS and self._amiris_outputs is not None:
+            # the outputs of an AMIRIS run hold the data of all columns
+            if not self._amiris_outputs.has_data_for_year(year):
+                self._amiris_outputs.read(year)
+            return self._amiris_outputs
         model_files = self._files_read[model]
         if file_id not in model_files.keys():
             model_files[file_id] = FILES[model][file_id]
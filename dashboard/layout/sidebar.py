@@ -3,22 +3,34 @@
 # SPDX-License-Identifier: Apache-2.0
 
 import streamlit as st
-from PIL import Image
-from streamlit_option_menu import option_menu
 
 from dashboard.tools.configuration import DashboardConfiguration
 from dashboard.tools.widgets import insert_sidebar_qrcode
 
 
+@st.cache_resource(show_spinner=False)
+def _load_logo(path: str, size: tuple[int, int]):
+    from PIL import Image
+
+    return Image.open(path).resize(size)
+
+
+@st.fragment
 def create_default_sidebar(dash_cfg: DashboardConfiguration):
+    """
+    Creates the sidebar as fragment, so that its widgets only rerun the sidebar itself.
+    The app is rerun only if the active tab or the plot style were changed, as the page content depends on these.
+    """
+    from streamlit_option_menu import option_menu
+
+    dependencies = (st.session_state["active_tab"], st.session_state["style"])
+
     if st.session_state["style"] == "dark":
-        logo = Image.open(f"{dash_cfg.logo_path}/logo-dark.png")
-        logo = logo.resize(dash_cfg.logo_size)
+        logo = _load_logo(f"{dash_cfg.logo_path}/logo-dark.png", dash_cfg.logo_size)
 
         st.image(logo, output_format="png")
     elif st.session_state["style"] == "light":
-        logo = Image.open(f"{dash_cfg.logo_path}/logo-light.png")
-        logo = logo.resize(dash_cfg.logo_size)
+        logo = _load_logo(f"{dash_cfg.logo_path}/logo-light.png", dash_cfg.logo_size)
 
         st.image(logo, output_format="png")
 
@@ -47,3 +59,6 @@ def create_default_sidebar(dash_cfg: DashboardConfiguration):
 
     if dash_cfg.qrcode_url is not None:
         insert_sidebar_qrcode(dash_cfg.qrcode_url, dash_cfg.qrcode_url_text)
+
+    if (st.session_state["active_tab"], st.session_state["style"]) != dependencies:
+        st.rerun(scope="app")
@@ -2,19 +2,22 @@
 #
 # SPDX-License-Identifier: CC0-1.0
 
-from .configuration import DashboardConfiguration, TabData, load_plots_config
-from .general import load_tab_modules
-from .options import (
-    delete_barred_user_overrides,
-    update_options_with_defaults,
-    update_options_with_overrides,
-)
-from .widgets import (
-    add_contact_widget,
-    add_data_download_button,
-    add_reference_widget,
-    setup_default_tabs,
-)
+import importlib
+
+# public names by their submodule - submodules are imported at first access only, to keep imports cheap
+_EXPORTS = {
+    "DashboardConfiguration": "configuration",
+    "TabData": "configuration",
+    "load_plots_config": "configuration",
+    "load_tab_modules": "general",
+    "delete_barred_user_overrides": "options",
+    "update_options_with_defaults": "options",
+    "update_options_with_overrides": "options",
+    "add_contact_widget": "widgets",
+    "add_data_download_button": "widgets",
+    "add_reference_widget": "widgets",
+    "setup_default_tabs": "widgets",
+}
 
 __all__ = [
     "DashboardConfiguration",
@@ -29,3 +32,10 @@ __all__ = [
     "setup_default_tabs",
     "load_plots_config",
 ]
+
+
+def __getattr__(name: str):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    module = importlib.import_module(f".{_EXPORTS[name]}", __name__)
+    return getattr(module, name)
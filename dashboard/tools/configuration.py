@@ -3,15 +3,22 @@
 # SPDX-License-Identifier: Apache-2.0
 
 import collections
+import functools
 import json
 import pathlib as pt
 
-import cattr
 from attr import define, field
 
-# cattr hooks
-cattr.register_structure_hook(pt.Path, lambda i, t: t(i))
-cattr.register_unstructure_hook(pt.Path, lambda i: i.as_posix())
+
+@functools.cache
+def _converter():
+    """Returns the cattr converter with hooks for paths - imported at first use, as only needed at startup"""
+    import cattr
+
+    converter = cattr.Converter()
+    converter.register_structure_hook(pt.Path, lambda i, t: t(i))
+    converter.register_unstructure_hook(pt.Path, lambda i: i.as_posix())
+    return converter
 
 
 @define
@@ -43,18 +50,22 @@ class DashboardConfiguration:
     qrcode_url_text: str = field(default="click here")
     logo_size: tuple[int, int] = field(default=(150, 100))
     logo_path: pt.Path | None = field(default=None)
+    show_timings: bool = field(default=False)
+    prefetch_groups: bool = field(default=False)
+    chart_cache_mb: int = field(default=256)
+    chart_cache_path: pt.Path | None = field(default=None)
 
     @classmethod
     def load(cls, path: pt.Path):
         if path.exists():
             with path.open("r") as ipf:
                 data = json.load(ipf)
-            return cattr.structure(data, cls)
+            return _converter().structure(data, cls)
         else:
             return cls()
 
     def save(self, path):
-        data = cattr.unstructure(self)
+        data = _converter().unstructure(self)
         with path.open("w") as opf:
             json.dump(data, opf)
 
@@ -5,10 +5,10 @@
 import importlib
 import pathlib as pt
 
-import qrcode
-
 
 def create_qrcode(url: str):
+    import qrcode
+
     img = qrcode.make(url)
     return img.get_image()
 
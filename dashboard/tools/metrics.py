@@ -0,0 +1,175 @@
+# SPDX-FileCopyrightText: 2024 German Aerospace Center
+#
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Error statistics of simulated against historic series, e.g. prices or dispatch per technology, and their duration curves.
+All series of all simulations and models are aligned into one array of shape (series, models, hours), so that every
+statistic is computed in one vectorized pass instead of one pandas pass per series and statistic.
+Only depends on numpy and pandas, so that scenario_run/amiris_eval.py uses it as well as the dashboard preprocessing.
+"""
+
+from collections.abc import Hashable
+
+import numpy as np
+import pandas as pd
+
+# statistics of each model, in the order of the columns of the table returned by `error_metrics`
+METRICS = ["hours", "corr", "mae", "rmse", "bias", "mean", "std", "min", "max"]
+# points of a downsampled duration curve, enough to show its shape at the width of a chart
+DURATION_POINTS = 200
+
+
+def align(
+    frames: dict[Hashable, pd.DataFrame],
+) -> tuple[list[Hashable], list[str], np.ndarray]:
+    """
+    Stacks given frames into one array, padding shorter frames and missing models with NaN
+
+    Args:
+        frames: one column per model with a common index each, e.g. {("amiris_germany2019", "price"): prices}
+
+    Returns:
+        keys of the frames, names of all models and the values of shape (frames, models, rows)
+    """
+    keys = list(frames)
+    models = list(dict.fromkeys(model for frame in frames.values() for model in frame))
+    rows = max((len(frame) for frame in frames.values()), default=0)
+    values = np.full((len(keys), len(models), rows), np.nan)
+    for i, frame in enumerate(frames.values()):
+        columns = [models.index(model) for model in frame.columns]
+        values[i, columns, : len(frame)] = frame.to_numpy(dtype=float).T
+    return keys, models, values
+
+
+def _statistics(values: np.ndarray, reference: np.ndarray) -> dict[str, np.ndarray]:
+    """
+    Returns the statistics of the `values` of shape (series, models, rows) against the `reference` of shape
+    (series, 1, rows) - NaN values are skipped, errors are computed on the rows where both are present
+    """
+    own = ~np.isnan(values)
+    count = own.sum(axis=-1)
+    mean = np.where(own, values, 0).sum(axis=-1) / count
+    deviation = np.where(own, values - mean[..., None], 0)
+    std = np.sqrt((deviation**2).sum(axis=-1) / (count - 1))
+
+    paired = own & ~np.isnan(reference)
+    hours = paired.sum(axis=-1)
+    residuals = np.where(paired, values - reference, 0)
+    # both series are centered on their paired rows only, as for `pd.Series.corr`
+    simulated_mean = np.where(paired, values, 0).sum(axis=-1) / hours
+    historic_mean = np.where(paired, reference, 0).sum(axis=-1) / hours
+    simulated = np.where(paired, values - simulated_mean[..., None], 0)
+    historic = np.where(paired, reference - historic_mean[..., None], 0)
+    covariance = (simulated * historic).sum(axis=-1)
+    scale = np.sqrt((simulated**2).sum(axis=-1) * (historic**2).sum(axis=-1))
+
+    return {
+        "hours": hours,
+        "corr": covariance / scale,
+        "mae": np.abs(residuals).sum(axis=-1) / hours,
+        "rmse": np.sqrt((residuals**2).sum(axis=-1) / hours),
+        "bias": residuals.sum(axis=-1) / hours,
+        "mean": mean,
+        "std": std,
+        "min": np.where(own, values, np.inf).min(axis=-1, initial=np.inf),
+        "max": np.where(own, values, -np.inf).max(axis=-1, initial=-np.inf),
+    }
+
+
+def _key_columns(table: pd.DataFrame, names: list[str] | None) -> list[str]:
+    """Splits the "key" column of given table into one column per name of its levels and returns their names"""
+    names = names or ["key"]
+    if len(names) > 1:
+        table[names] = pd.DataFrame(table["key"].tolist(), index=table.index)
+    else:
+        table[names[0]] = table["key"]
+    return names
+
+
+def error_metrics(
+    frames: dict[Hashable, pd.DataFrame],
+    reference: str,
+    names: list[str] | None = None,
+) -> pd.DataFrame:
+    """
+    Computes the statistics of all models of all given frames against the `reference` column of each frame
+
+    Args:
+        frames: one column per model and the reference with a common index each, by a key naming the series, e.g.
+            {("amiris_germany2019", "price"): prices with columns "AMIRIS", "ASSUME" and "ENTSO-E"}
+        reference: name of the column holding the historic values - its errors are 0 and its correlation 1
+        names: of the levels of the keys, e.g. ["simulation", "variable"]
+
+    Returns:
+        tidy table with one row per series and model, the key levels and "model" as columns followed by the `METRICS`:
+        number of paired hours, Pearson correlation, mean absolute and root mean square error, mean error of the
+        model, and mean, sample standard deviation, minimum and maximum of the model itself - NaN if not defined,
+        e.g. the correlation of constant series. Models without any value in a frame get no row for it.
+
+    Raises:
+        ValueError: if no frame has a `reference` column
+    """
+    keys, models, values = align(frames)
+    if reference not in models:
+        raise ValueError(f"Reference '{reference}' is missing in all frames")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        statistics = _statistics(values, values[:, [models.index(reference)]])
+    own = (~np.isnan(values)).any(axis=-1)
+    for statistic in ["min", "max"]:
+        statistics[statistic] = np.where(own, statistics[statistic], np.nan)
+
+    index = pd.MultiIndex.from_product(
+        [pd.Index(keys, tupleize_cols=False), models], names=["key", "model"]
+    )
+    table = pd.DataFrame(
+        {name: statistic.ravel() for name, statistic in statistics.items()},
+        index=index,
+    )
+    # models missing in a frame are no rows of the table
+    table = table[own.ravel()].reset_index()
+    names = _key_columns(table, names)
+    table["hours"] = table["hours"].astype(int)
+    return table[[*names, "model", *METRICS]]
+
+
+def duration_curves(
+    frames: dict[Hashable, pd.DataFrame],
+    points: int = DURATION_POINTS,
+    names: list[str] | None = None,
+) -> pd.DataFrame:
+    """
+    Computes the duration curves of all models of all given frames, i.e. their values sorted in descending order,
+    downsampled to the same number of evenly spaced quantiles each
+
+    Args:
+        frames: one column per model by a key naming the series, as for `error_metrics`
+        points: number of quantiles of each curve, including the maximum and the minimum
+        names: of the levels of the keys, e.g. ["group", "year"]
+
+    Returns:
+        tidy table with one row per series, model and point, the key levels and "model" as columns followed by
+        "share" - the share of the values that are at least "value", from 0 to 1. Models without any value in a frame
+        get no rows for it.
+    """
+    keys, models, values = align(frames)
+    count = (~np.isnan(values)).sum(axis=-1)
+    # NaN are sorted to the end, so that the values of each series come first in descending order
+    ordered = -np.sort(-values, axis=-1)
+    shares = np.linspace(0, 1, points)
+    # quantiles are interpolated linearly between the neighbouring sorted values
+    positions = shares * np.maximum(count - 1, 0)[..., None]
+    lower = np.floor(positions).astype(int)
+    upper = np.ceil(positions).astype(int)
+    below = np.take_along_axis(ordered, lower, axis=-1)
+    above = np.take_along_axis(ordered, upper, axis=-1)
+    curves = below + (above - below) * (positions - lower)
+
+    own = np.repeat(count.ravel() > 0, points)
+    index = pd.MultiIndex.from_product(
+        [pd.Index(keys, tupleize_cols=False), models, shares],
+        names=["key", "model", "share"],
+    )
+    table = pd.DataFrame({"value": curves.ravel()}, index=index)[own].reset_index()
+    names = _key_columns(table, names)
+    return table[[*names, "model", "share", "value"]]
@@ -37,11 +37,10 @@ def update_options_with_overrides(options, user):
     return __update(options, user)
 
 
-def update_options_with_defaults(options):
+def update_options_with_defaults(options, style: str | None = None):
+    style = style if style is not None else st.session_state["style"]
     defaults = {
-        "backgroundColor": "#FFFFFF"
-        if st.session_state["style"] != "dark"
-        else "#0E1117",
+        "backgroundColor": "#FFFFFF" if style != "dark" else "#0E1117",
         "toolbox": {
             "orient": "vertical",
             "show": True,
@@ -0,0 +1,175 @@
+# SPDX-FileCopyrightText: 2024 German Aerospace Center
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import hashlib
+import json
+import os
+import pathlib as pt
+import threading
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from concurrent.futures import Future, ThreadPoolExecutor
+
+BYTES_PER_DATA_POINT = 64
+
+
+def _lower_priority() -> None:
+    """Lowers the scheduling priority of the calling worker thread where supported (Linux)"""
+    try:
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 19)
+    except (AttributeError, OSError):
+        pass
+
+
+def estimate_size(options: dict) -> int:
+    """Returns a rough estimate of the memory in bytes held by the data arrays of given ECharts `options`"""
+    points = sum(len(series.get("data", [])) for series in options.get("series", []))
+    x_axis = options.get("xAxis", {})
+    if isinstance(x_axis, dict):
+        points += len(x_axis.get("data", []))
+    return points * BYTES_PER_DATA_POINT
+
+
+class ChartCache:
+    """
+    Memory-bounded LRU cache of chart options that can be warmed by a low-priority background worker.
+    If a directory is given, options are also persisted there as json files, so that they survive restarts.
+    """
+
+    def __init__(
+        self,
+        memory_budget_mb: float = 256,
+        prefetch: bool = False,
+        directory: pt.Path | None = None,
+    ) -> None:
+        """
+        Create a new ChartCache
+
+        Args:
+            memory_budget_mb: estimated memory that all cached options may occupy together
+            prefetch: if True, a background worker is started that builds options requested via `prefetch`
+            directory: to persist options in - keys must then be json-serialisable; if None, nothing is persisted
+        """
+        self._directory = directory
+        if directory is not None:
+            directory.mkdir(parents=True, exist_ok=True)
+        self._budget = memory_budget_mb * 1e6
+        self._entries: OrderedDict[Hashable, tuple[dict, int]] = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self._pending: list[Future] = []
+        self._executor = (
+            ThreadPoolExecutor(
+                max_workers=1,
+                thread_name_prefix="chart-prefetch",
+                initializer=_lower_priority,
+            )
+            if prefetch
+            else None
+        )
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def get_or_build(self, key: Hashable, build: Callable[[], dict]) -> dict:
+        """
+        Returns cached options for given `key` or builds and caches them, evicting least recently used entries if needed
+
+        Args:
+            key: identifying the options, must contain all dependencies of `build`
+            build: creates the options if they are not cached yet
+
+        Returns:
+            ECharts options dictionary
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key][0]
+        options = self._load_or_build(key, build)
+        self._put(key, options, evict=True)
+        return options
+
+    def persist(self, key: Hashable, build: Callable[[], dict]) -> bool:
+        """
+        Builds and persists options for given `key` without keeping them in memory, unless they are persisted already
+
+        Args:
+            key: identifying the options, must contain all dependencies of `build`
+            build: creates the options if they are not persisted yet
+
+        Returns:
+            True if the options were built, False if they were persisted already
+        """
+        path = self._path_of(key)
+        if path is None or path.exists():
+            return False
+        self._write(path, build())
+        return True
+
+    def prefetch(self, tasks: dict[Hashable, Callable[[], dict]]) -> None:
+        """
+        Replaces all pending prefetch tasks by the given ones, which are built in given order in the background.
+        Prefetched options never evict other entries - they are dropped if the memory budget is exhausted.
+        Does nothing if prefetching is disabled.
+
+        Args:
+            tasks: builders of options by their key
+        """
+        if self._executor is None:
+            return
+        for future in self._pending:
+            future.cancel()
+        self._pending = [
+            self._executor.submit(self._warm, key, build)
+            for key, build in tasks.items()
+        ]
+
+    def _warm(self, key: Hashable, build: Callable[[], dict]) -> None:
+        """Builds and caches options for given `key` if these are not yet cached"""
+        if key in self:
+            return
+        self._put(key, self._load_or_build(key, build), evict=False)
+
+    def _load_or_build(self, key: Hashable, build: Callable[[], dict]) -> dict:
+        """Returns persisted options for given `key` or builds them and persists them if a directory is set"""
+        path = self._path_of(key)
+        if path is not None and path.exists():
+            with path.open("r") as ipf:
+                return json.load(ipf)
+        options = build()
+        if path is not None:
+            self._write(path, options)
+        return options
+
+    def _path_of(self, key: Hashable) -> pt.Path | None:
+        """Returns path of the file persisting options for given `key`, or None if nothing is persisted"""
+        if self._directory is None:
+            return None
+        name = hashlib.sha256(json.dumps(key).encode("utf8")).hexdigest()
+        return self._directory / f"{name}.json"
+
+    @staticmethod
+    def _write(path: pt.Path, options: dict) -> None:
+        """Writes options to given path - via a temporary file, so that concurrent readers never see partial files"""
+        temporary = path.with_suffix(f".{threading.get_native_id()}.tmp")
+        with temporary.open("w") as opf:
+            json.dump(options, opf)
+        temporary.replace(path)
+
+    def _put(self, key: Hashable, options: dict, evict: bool) -> None:
+        """Adds given options to the cache if they fit into the memory budget, evicting old entries if `evict` is True"""
+        size = estimate_size(options)
+        with self._lock:
+            if key in self._entries:
+                return
+            if evict:
+                while self._entries and self._size + size > self._budget:
+                    _, (_, evicted_size) = self._entries.popitem(last=False)
+                    self._size -= evicted_size
+            if self._size + size > self._budget:
+                return
+            self._entries[key] = (options, size)
+            self._size += size
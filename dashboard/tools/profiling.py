@@ -0,0 +1,75 @@
+# SPDX-FileCopyrightText: 2024 German Aerospace Center
+#
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Reports the import time of the dashboard per module, run as:
+`python -m dashboard.tools.profiling [--top N] [--packages] [module ...]`
+"""
+
+import argparse
+import collections
+import subprocess
+import sys
+
+IMPORT_TIME_PREFIX = "import time:"
+
+
+def profile_imports(modules: list[str]) -> list[tuple[str, int, int]]:
+    """
+    Imports given modules in a fresh interpreter with `-X importtime`
+
+    Args:
+        modules: to be imported, in given order
+
+    Returns:
+        (module name, self time in us, cumulative time in us) of each imported module in order of import
+    """
+    statement = "; ".join(f"import {module}" for module in modules)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    timings = []
+    for line in result.stderr.splitlines():
+        if not line.startswith(IMPORT_TIME_PREFIX):
+            continue
+        self_us, cumulative_us, name = line[len(IMPORT_TIME_PREFIX) :].split("|")
+        if not self_us.strip().isdigit():
+            continue  # header line
+        timings.append((name.strip(), int(self_us), int(cumulative_us)))
+    return timings
+
+
+def by_package(timings: list[tuple[str, int, int]]) -> dict[str, int]:
+    """Returns summed self time in us by top-level package"""
+    totals = collections.Counter()
+    for name, self_us, _ in timings:
+        totals[name.split(".")[0]] += self_us
+    return dict(totals)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("modules", nargs="*", default=["streamlit_app"])
+    parser.add_argument("--top", type=int, default=25)
+    parser.add_argument(
+        "--packages", action="store_true", help="aggregate by top-level package"
+    )
+    args = parser.parse_args()
+
+    timings = profile_imports(args.modules)
+    if args.packages:
+        rows = sorted(by_package(timings).items(), key=lambda row: -row[1])
+        print(f"{'self [ms]':>10}  package")
+        for name, self_us in rows[: args.top]:
+            print(f"{self_us / 1e3:10.1f}  {name}")
+    else:
+        rows = sorted(timings, key=lambda row: -row[2])
+        print(f"{'self [ms]':>10} {'cumulative [ms]':>16}  module")
+        for name, self_us, cumulative_us in rows[: args.top]:
+            print(f"{self_us / 1e3:10.1f} {cumulative_us / 1e3:16.1f}  {name}")
+    total_us = sum(self_us for _, self_us, _ in timings)
+    print(f"total import time of {', '.join(args.modules)}: {total_us / 1e3:.0f} ms")
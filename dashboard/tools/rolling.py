@@ -0,0 +1,241 @@
+# SPDX-FileCopyrightText: 2024 German Aerospace Center
+#
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Statistics of time windows, e.g. 7-day means or daily minima, for all columns of a frame at once.
+Every window is a range of rows, so that sums and counts are differences of cumulative sums, and minima and maxima are
+looked up in a table of the extremes of all ranges whose length is a power of two. Both are computed once for all
+windows. Only quantiles need the values of each window.
+Only depends on numpy and pandas, so that scenario_run/amiris_eval.py uses it as well as the timeseries tab.
+"""
+
+import numpy as np
+import pandas as pd
+
+# windows offered for smoothing
+WINDOWS = ["24h", "7D", "30D"]
+# values gathered at once to compute quantiles of bins
+QUANTILE_BLOCK = 1 << 22
+
+
+def _quantile(statistic: str) -> float | None:
+    """Returns the quantile of a statistic like "median" or "q95" - None for other statistics"""
+    if statistic == "median":
+        return 0.5
+    if statistic.startswith("q"):
+        return float(statistic[1:]) / 100
+    return None
+
+
+def window_bounds(
+    times: pd.DatetimeIndex, window: str, rolling: bool
+) -> tuple[np.ndarray, np.ndarray, pd.DatetimeIndex | None]:
+    """
+    Returns the first and the end row of each window of given length
+
+    Args:
+        times: of the rows in ascending order
+        window: length of the windows, e.g. "7D"
+        rolling: if True, each row ends a window reaching back `window` from its time, as `rolling(window)`;
+            otherwise the windows are consecutive bins starting at the first midnight, as `resample(window)`
+
+    Returns:
+        first rows and end rows (exclusive) of the windows and the start times of the bins - None if rolling
+    """
+    length = pd.Timedelta(window)
+    if rolling:
+        # searching integer times avoids the overhead of datetime arithmetic
+        steps = times.asi8
+        starts = steps.searchsorted(
+            steps - length // pd.Timedelta(1, unit=times.unit), side="right"
+        )
+        return starts, np.arange(1, len(times) + 1), None
+    origin = times[0].floor("D")
+    bins = np.asarray((times - origin) // length)
+    # bins without rows are empty windows, as they are in a resampled series
+    labels = np.arange(bins[-1] + 1)
+    starts = bins.searchsorted(labels, side="left")
+    ends = bins.searchsorted(labels, side="right")
+    return starts, ends, pd.date_range(origin, periods=len(labels), freq=length)
+
+
+def _cumulative(values: np.ndarray) -> np.ndarray:
+    """Returns the cumulative sums of the rows of `values`, preceded by a row of zeros"""
+    cumulative = np.zeros((len(values) + 1, values.shape[1]))
+    np.cumsum(values, axis=0, out=cumulative[1:])
+    return cumulative
+
+
+def _differences(
+    cumulative: np.ndarray, starts: np.ndarray, ends: np.ndarray
+) -> np.ndarray:
+    """Returns the sums of the rows from `starts` to `ends` (exclusive) as differences of their cumulative sums"""
+    return np.take(cumulative, ends, axis=0) - np.take(cumulative, starts, axis=0)
+
+
+def _extreme_table(
+    values: np.ndarray, longest: int, extreme: np.ufunc
+) -> list[np.ndarray]:
+    """
+    Returns the minima or maxima of all ranges of rows whose length is a power of two up to `longest`
+
+    Args:
+        values: without NaN, of shape (rows, columns)
+        longest: number of rows of the longest window
+        extreme: `np.minimum` or `np.maximum`
+
+    Returns:
+        extremes of the ranges of length 2**level starting at each row, by level
+    """
+    table = [values]
+    while 1 << len(table) <= longest:
+        length = 1 << (len(table) - 1)
+        table.append(extreme(table[-1][:-length], table[-1][length:]))
+    return table
+
+
+def _range_extremes(
+    table: list[np.ndarray], starts: np.ndarray, ends: np.ndarray, extreme: np.ufunc
+) -> np.ndarray:
+    """
+    Returns the minima or maxima of the rows from `starts` to `ends` (exclusive, after the starts) for each column,
+    each covered by the two ranges of the `table` of the same power of two starting at its first and ending at its
+    last row
+    """
+    levels = np.floor(np.log2(ends - starts)).astype(int)
+    result = np.empty((len(starts), table[0].shape[1]))
+    for level in np.unique(levels):
+        windows = np.flatnonzero(levels == level)
+        first, last = starts[windows], ends[windows] - (1 << level)
+        result[windows] = extreme(table[level][first], table[level][last])
+    return result
+
+
+def _range_quantiles(
+    values: np.ndarray, starts: np.ndarray, ends: np.ndarray, quantiles: list[float]
+) -> np.ndarray:
+    """
+    Returns the quantiles of the rows of `values` from `starts` to `ends` for each column, interpolated linearly as
+    by `np.quantile` and skipping NaN - the windows are gathered and sorted in blocks of `QUANTILE_BLOCK` values, which
+    suits consecutive bins, where every row is sorted once
+
+    Returns:
+        quantiles of shape (quantiles, windows, columns)
+    """
+    longest = max(int((ends - starts).max()), 1)
+    result = np.full((len(quantiles), len(starts), values.shape[1]), np.nan)
+    step = max(QUANTILE_BLOCK // (longest * values.shape[1]), 1)
+    padded = np.vstack([values, np.full((1, values.shape[1]), np.nan)])
+    for block in range(0, len(starts), step):
+        first, end = starts[block : block + step], ends[block : block + step]
+        rows = first[:, None] + np.arange(longest)
+        # rows beyond the end of their window point to the appended row of NaN
+        rows = np.where(rows < end[:, None], rows, len(values))
+        ordered = np.sort(padded[rows], axis=1)
+        count = (~np.isnan(ordered)).sum(axis=1)
+        for i, quantile in enumerate(quantiles):
+            positions = quantile * np.maximum(count - 1, 0)[:, None]
+            lower = np.floor(positions).astype(int)
+            upper = np.ceil(positions).astype(int)
+            below = np.take_along_axis(ordered, lower, axis=1)[:, 0]
+            above = np.take_along_axis(ordered, upper, axis=1)[:, 0]
+            fraction = (positions - lower)[:, 0]
+            result[i, block : block + step] = below + (above - below) * fraction
+    return result
+
+
+def window_statistics(
+    data: pd.DataFrame,
+    windows: list[str],
+    statistics: list[str],
+    rolling: bool = True,
+    times: pd.DatetimeIndex | None = None,
+) -> dict[str, pd.DataFrame]:
+    """
+    Computes given statistics of all columns of given data for each of the given windows - NaN values are skipped
+
+    Args:
+        data: with one column per series
+        windows: lengths of the windows, e.g. ["24h", "7D", "30D"]
+        statistics: "mean", "sum", "count", "min", "max", "median" or quantiles in percent like "q05" or "q95"
+        rolling: if True, the statistics of the window ending at each row are computed, as by `rolling(window)`;
+            otherwise those of consecutive bins, as by `resample(window)`
+        times: of the rows in ascending order - by default the index of `data`
+
+    Returns:
+        statistics by window, each with the columns (statistic, column of the data) - indexed as `data` if rolling,
+        otherwise by the start of the bins; NaN for windows without values
+
+    Raises:
+        ValueError: if a statistic is unknown
+    """
+    unknown = [
+        statistic
+        for statistic in statistics
+        if statistic not in ["mean", "sum", "count", "min", "max"]
+        and _quantile(statistic) is None
+    ]
+    if unknown:
+        raise ValueError(f"Unknown statistics {unknown}")
+    times = pd.DatetimeIndex(data.index if times is None else times)
+    values = data.to_numpy(dtype=float)
+    present = ~np.isnan(values)
+    quantiles = {
+        statistic: _quantile(statistic)
+        for statistic in statistics
+        if _quantile(statistic) is not None
+    }
+    bounds = {window: window_bounds(times, window, rolling) for window in windows}
+    # the cumulative sums and extremes are shared by all windows
+    counts = _cumulative(present)
+    sums = None
+    if "sum" in statistics or "mean" in statistics:
+        sums = _cumulative(np.where(present, values, 0))
+    longest = max(int((ends - starts).max()) for starts, ends, _ in bounds.values())
+    tables = {
+        statistic: (
+            extreme,
+            _extreme_table(np.where(present, values, fill), longest, extreme),
+        )
+        for statistic, extreme, fill in [
+            ("min", np.minimum, np.inf),
+            ("max", np.maximum, -np.inf),
+        ]
+        if statistic in statistics
+    }
+
+    results = {}
+    for window, (starts, ends, labels) in bounds.items():
+        computed = {"count": _differences(counts, starts, ends)}
+        empty = computed["count"] == 0
+        if sums is not None:
+            computed["sum"] = _differences(sums, starts, ends)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                computed["mean"] = computed["sum"] / computed["count"]
+        # empty bins start at the row of the next bin, their extremes of this one row are discarded
+        for statistic, (extreme, table) in tables.items():
+            computed[statistic] = _range_extremes(
+                table, starts, np.maximum(ends, starts + 1), extreme
+            )
+        if quantiles and rolling:
+            # pandas keeps the values of a rolling window sorted while moving it, instead of sorting each window
+            moving = pd.DataFrame(values, index=times).rolling(pd.Timedelta(window))
+            for statistic, quantile in quantiles.items():
+                computed[statistic] = moving.quantile(quantile).to_numpy()
+        elif quantiles:
+            found = _range_quantiles(values, starts, ends, list(quantiles.values()))
+            computed.update(zip(quantiles, found))
+
+        frames = {}
+        for statistic in statistics:
+            result = computed[statistic]
+            if statistic != "count":
+                result = np.where(empty, np.nan, result)
+            frames[statistic] = pd.DataFrame(
+                result,
+                index=data.index if labels is None else labels,
+                columns=data.columns,
+            )
+        results[window] = pd.concat(frames, axis=1)
+    return results
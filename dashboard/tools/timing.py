@@ -0,0 +1,27 @@
+# SPDX-FileCopyrightText: 2024 German Aerospace Center
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import time
+from contextlib import contextmanager
+
+import streamlit as st
+
+
+@contextmanager
+def timed(label: str, show: bool = False):
+    """
+    Measures the time spent in the wrapped block and stores it in the session state under "timings"
+
+    Args:
+        label: under which the duration is stored
+        show: if True, the duration is displayed below the wrapped block
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        duration_ms = (time.perf_counter() - start) * 1e3
+        st.session_state.setdefault("timings", {})[label] = duration_ms
+        if show:
+            st.caption(f"{label}: {duration_ms:.0f} ms")
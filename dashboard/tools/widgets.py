@@ -8,7 +8,6 @@ from io import BytesIO
 
 import pandas as pd
 import streamlit as st
-from markdownlit import mdlit
 
 from dashboard.tools.configuration import DashboardConfiguration
 from dashboard.tools.general import create_qrcode
@@ -20,6 +19,8 @@ def setup_default_tabs(
     metadata: dict,
     plots_cfg: dict,
 ):
+    from markdownlit import mdlit
+
     for itab in dash_cfg.tabs:
         if itab.id in ["references", "contacts"]:
             continue
@@ -39,6 +40,8 @@ def setup_default_tabs(
 
 
 def add_contact_widget(dash_cfg):
+    from markdownlit import mdlit
+
     itab = None
     for i in dash_cfg.tabs:
         if i.id == "contacts":
@@ -51,6 +54,8 @@ def add_contact_widget(dash_cfg):
 
 
 def add_reference_widget(dash_cfg):
+    from markdownlit import mdlit
+
     if dash_cfg.enable_references:
         itab = None
         for i in dash_cfg.tabs:
@@ -75,13 +80,17 @@ def add_data_download_button(
     )
 
 
-def insert_sidebar_qrcode(url: str, url_text: str):
+@st.cache_data(show_spinner=False)
+def _qrcode_as_base64(url: str) -> str:
     qr = create_qrcode(url)
 
     img_io = BytesIO()
     qr.resize((200, 200)).save(img_io, "PNG")
+    return b64encode(img_io.getvalue()).decode("ascii")
+
 
+def insert_sidebar_qrcode(url: str, url_text: str):
     st.markdown(
-        f'<p style="text-align: center; color: grey;"><a href="{url}"><img src="data:image/png;base64,{b64encode(img_io.getvalue()).decode("ascii")}" alt="{url_text}"/></p>',
+        f'<p style="text-align: center; color: grey;"><a href="{url}"><img src="data:image/png;base64,{_qrcode_as_base64(url)}" alt="{url_text}"/></p>',
         unsafe_allow_html=True,
     )
@@ -2,15 +2,60 @@
 #
 # SPDX-License-Identifier: Apache-2.0
 
+import argparse
 from pathlib import Path
 
+from dashboard.data import Model
+from dashboard.data.amiris_outputs import AmirisOutputs
 from dashboard.data.preparation import DataPreparer
 from dashboard.data.reader import DataReader
+from dashboard.tools.metrics import DURATION_POINTS
 
 if __name__ == "__main__":
-    preparer = DataPreparer()
-    data_reader = DataReader(preparer, Path("./data/csv"))
-    for year in [2015, 2016, 2017, 2018, 2019]:
+    parser = argparse.ArgumentParser(
+        description="Create the data file of the dashboard from the exported CSV files or the AMIRIS outputs"
+    )
+    parser.add_argument(
+        "--years", type=int, nargs="+", default=[2015, 2016, 2017, 2018, 2019]
+    )
+    parser.add_argument(
+        "--models",
+        nargs="+",
+        choices=[model.name for model in Model],
+        default=[model.name for model in Model],
+        help="models whose data are read",
+    )
+    parser.add_argument(
+        "--amiris-outputs",
+        type=Path,
+        help="folder with the AMIRIS outputs of each scenario, e.g. scenario_run/scenario - "
+        "if given, AMIRIS data are aggregated from these instead of the CSV files",
+    )
+    parser.add_argument(
+        "--scenarios",
+        type=Path,
+        default=Path("../amiris-examples"),
+        help="folder with the AMIRIS scenarios, to assign the agents of the outputs to technologies",
+    )
+    parser.add_argument("--country", default="Germany")
+    args = parser.parse_args()
+
+    amiris_outputs = None
+    if args.amiris_outputs:
+        amiris_outputs = AmirisOutputs(
+            args.amiris_outputs, args.scenarios, args.country
+        )
+    # the models are compared to the historical data in the metrics tab
+    preparer = DataPreparer(
+        metrics_reference=Model.HISTORICAL.name, duration_points=DURATION_POINTS
+    )
+    data_reader = DataReader(
+        preparer,
+        Path("./data/csv"),
+        tuple(Model[model] for model in args.models),
+        amiris_outputs,
+    )
+    for year in args.years:
         data_reader.read_all(year)
     preparer.save_to_file("./data/compare.hdf5")
 
@@ -0,0 +1,34 @@
+# SPDX-FileCopyrightText: 2024 German Aerospace Center
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import argparse
+import time
+from pathlib import Path
+
+from dashboard.data.loaders import load_data
+from dashboard.tools import DashboardConfiguration, load_plots_config, load_tab_modules
+from dashboard.tools.prefetch import ChartCache
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Precompute the chart options of all tabs into the persistent chart cache"
+    )
+    parser.add_argument("--config", type=Path, default=Path("./dashboard_config.json"))
+    args = parser.parse_args()
+
+    dash_cfg = DashboardConfiguration.load(args.config)
+    if dash_cfg.chart_cache_path is None:
+        raise SystemExit("No 'chart_cache_path' configured - nothing to warm up.")
+
+    start = time.time()
+    data, metadata = load_data(dash_cfg.data_path)
+    plots_cfg = load_plots_config(Path("./configurations"))
+    chart_cache = ChartCache(directory=dash_cfg.chart_cache_path)
+    styles = ["light", "dark"] if dash_cfg.enable_darkmode_toggle else ["light"]
+
+    for tab_id, tab in load_tab_modules().items():
+        if hasattr(tab, "warm_up"):
+            built = tab.warm_up(chart_cache, data, metadata, plots_cfg, styles)
+            print(f"tab {tab_id}: built {built} chart options")
+    print(f"took {time.time() - start:.1f} seconds")
@@ -4,16 +4,111 @@
 
 # now we can evaluate the runs
 
-import pickle
+import argparse
+import multiprocessing
+import sys
+import time
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
 from pathlib import Path
 
-import matplotlib.pyplot as plt
-import numpy as np
 import pandas as pd
 
+import figures
+from cache import invalidate
 from queries import query_data
 
-plt.style.use("seaborn-v0_8")
+# the statistics are shared with the dashboard, whose package is in the parent directory
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from dashboard.tools.metrics import error_metrics  # noqa: E402
+from dashboard.tools.rolling import window_statistics  # noqa: E402
+
+# technologies whose dispatch is compared to the historic one
+TECHS = [
+    "nuclear",
+    "wind_offshore",
+    "wind_onshore",
+    "solar",
+    "lignite",
+    "natural gas",
+    "hard coal",
+    "oil",
+    "hydro",
+]
+# column of the historic values in the evaluated series
+REFERENCE = "ENTSO-E"
+# price statistics in the columns of the LaTeX table
+PRICE_TABLE = ["mae", "rmse", "max", "min", "mean", "std"]
+
+
+def evaluated_series(data, from_date: str, to_date: str) -> dict[str, pd.DataFrame]:
+    """
+    Returns the prices and the dispatch of each technology of both models next to the historic ones
+
+    Args:
+        data: of the simulation as returned by `query_data`
+        from_date: first day to evaluate
+        to_date: last day to evaluate
+
+    Returns:
+        columns "AMIRIS", "ASSUME" and `REFERENCE` aligned on their time index, by "price" or the technology
+    """
+    series = {
+        "price": pd.concat(
+            {
+                "AMIRIS": data["preis_amiris"],
+                "ASSUME": data["preis_assume"],
+                REFERENCE: data["preis_entsoe"],
+            },
+            axis=1,
+        )
+    }
+    for tech in TECHS:
+        if tech not in data["dispatch_entsoe"] or f"dispatch_{tech}" not in data:
+            continue
+        # the historic dispatch is given in kW
+        series[tech] = pd.concat(
+            {
+                "AMIRIS": data[f"dispatch_{tech}"]["AMIRIS"],
+                "ASSUME": data[f"dispatch_{tech}"]["ASSUME"],
+                REFERENCE: data["dispatch_entsoe"][tech] / 1e3,
+            },
+            axis=1,
+        )
+    return {name: frame[from_date:to_date] for name, frame in series.items()}
+
+
+def duration_curve(values: pd.Series) -> pd.Series:
+    """Returns the values of given series without NaN in descending order, indexed by their rank"""
+    return values.dropna().sort_values(ascending=False).reset_index(drop=True)
+
+
+def price_table(metrics: pd.DataFrame) -> str:
+    """Returns the price statistics of one simulation, as returned by `error_metrics`, as LaTeX table"""
+    prices = metrics.query("variable == 'price'").set_index("model")
+    rows = "\\\\ \\hline\n".join(
+        f"                {label} & "
+        + " & ".join(f"{row[metric]:.2f}" for metric in PRICE_TABLE)
+        for label, row in [
+            ("AMIRIS", prices.loc["AMIRIS"]),
+            ("ASSUME", prices.loc["ASSUME"]),
+            ("Historic", prices.loc[REFERENCE]),
+        ]
+    )
+    table_str = f"""
+                ~ & MAE & RMSE & max & min & mean & std \\\\ \\hline
+{rows}\\\\
+        """
+    return (
+        r"""
+        \begin{table}[!ht]
+            \centering
+            \begin{tabular}{l|l|l|l|l|l|l}%s   \end{tabular}
+            \caption{Quantitative results of the price fit towards the historic dataset of Germany 2019}
+            \label{tab:quantitative results}
+        \end{table}
+        """  # noqa: UP031
+        % table_str
+    )
 
 
 def plot_all_plots(
@@ -22,190 +117,108 @@ def plot_all_plots(
     to_date: str,
     data,
     latex_table: bool = False,
-):
+    executor: Executor | None = None,
+    file_format: str | None = None,
+    density: bool = False,
+) -> dict[str, Future | tuple[float, int] | None]:
+    """
+    Computes the metrics of the simulation into `data["metrics"]`, prints them and renders its figures into
+    `output/<simulation>`
+
+    Args:
+        simulation: name of the simulation
+        from_date: first day to evaluate
+        to_date: last day to evaluate
+        data: of the simulation as returned by `query_data`, extended by the dispatch duration curves and the metrics
+        latex_table: if True, the metrics are also written to a LaTeX table
+        executor: to render the figures in - if None, they are rendered one after another
+        file_format: of all figures, e.g. "png" - if None, each figure is saved in the format of its output policy
+        density: if True, the price scatter plot is replaced by 2D histograms
+
+    Returns:
+        future of the render duration and file size of each figure by its name - None if unchanged,
+        as returned by `figures.render`
+    """
     base_path = Path("output", simulation)
+    # figure function and the slices of the data it shows, by file name
+    plots = {}
 
-    # set plot to true here to see plots inline
-    def savefig(path: str, plot=False, *args, **kwargs):
-        output_path = Path(base_path, f"{path}.svg")
-        output_path.parent.mkdir(parents=True, exist_ok=True)
-        plt.savefig(
-            output_path, *args, transparent=False, bbox_inches="tight", **kwargs
-        )
-        if plot:
-            plt.show()
-        plt.close()
-
-    # pt = data["dispatch_wind_onshore"]
-    # (pt["AMIRIS"] - pt["ASSUME"]).plot()
+    # the figures and the metrics show the same aligned series - hours missing in a series are NaN
+    series = evaluated_series(data, from_date, to_date)
+    prices = series["price"]
+    preis_entsoe = prices[REFERENCE]
+    preis_amiris = prices["AMIRIS"]
+    preis_assume = prices["ASSUME"]
 
     ### price duration curve
-    plt.figure(figsize=(10, 5))
-    data["preislinie_amiris"].plot()
-    data["preislinie_assume"].plot()
-    data["preislinie_entsoe"].plot()
-    plt.xlabel("hours")
-    plt.ylabel("price in [€/MW]")
-    plt.legend(["AMIRIS", "ASSUME", "ENTSO-E"])
-    savefig("price_duration_curve")
+    plots["price_duration_curve"] = (
+        figures.price_duration_curve,
+        duration_curve(preis_amiris),
+        duration_curve(preis_assume),
+        duration_curve(preis_entsoe),
+    )
 
     ### dispatch duration curve
 
-    techs = [
-        "nuclear",
-        "wind_offshore",
-        "wind_onshore",
-        "solar",
-        "lignite",
-        "natural gas",
-        "hard coal",
-        "oil",
-        "hydro",
-    ]
     data["ddcs"] = {}
-    for tech in techs:
-        if tech not in data["dispatch_entsoe"]:
-            continue
-        if f"dispatch_{tech}" not in data:
+    for tech in TECHS:
+        if tech not in series:
             continue
-        data["ddcs"][f"{tech}_entsoe"] = (
-            data["dispatch_entsoe"][tech]
-            .sort_values(ascending=False)
-            .reset_index(drop=True)
+        # the duration curves are plotted in kW
+        data["ddcs"][f"{tech}_entsoe"] = duration_curve(series[tech][REFERENCE]) * 1e3
+        data["ddcs"][f"{tech}_assume"] = duration_curve(series[tech]["ASSUME"]) * 1e3
+        data["ddcs"][f"{tech}_amiris"] = duration_curve(series[tech]["AMIRIS"]) * 1e3
+
+        plots[f"dispatch_duration_curve_{tech}"] = (
+            figures.dispatch_duration_curve,
+            tech,
+            data["ddcs"][f"{tech}_entsoe"],
+            data["ddcs"][f"{tech}_amiris"],
+            data["ddcs"][f"{tech}_assume"],
         )
 
-        data["ddcs"][f"{tech}_assume"] = (
-            data[f"dispatch_{tech}"]["ASSUME"]
-            .sort_values(ascending=False)
-            .reset_index(drop=True)
-            * 1e3
-        )
-        data["ddcs"][f"{tech}_amiris"] = (
-            data[f"dispatch_{tech}"]["AMIRIS"]
-            .sort_values(ascending=False)
-            .reset_index(drop=True)
-            * 1e3
-        )
+    # all statistics of the prices and the dispatch of all technologies in one pass
+    data["metrics"] = error_metrics(
+        {(simulation, variable): frame for variable, frame in series.items()},
+        REFERENCE,
+        ["simulation", "variable"],
+    )
+    print(
+        data["metrics"]
+        .drop(columns="simulation")
+        .to_string(index=False, float_format="{:.4f}".format)
+    )
+    price_metrics = data["metrics"].query("variable == 'price'").set_index("model")
+    corref_amiris = price_metrics.loc["AMIRIS", "corr"]
+    corref_assume = price_metrics.loc["ASSUME", "corr"]
 
-        plt.figure(figsize=(10, 5))
-        (data["ddcs"][f"{tech}_entsoe"] / 1e6).plot()
-        (data["ddcs"][f"{tech}_amiris"] / 1e6).plot()
-        (data["ddcs"][f"{tech}_assume"] / 1e6).plot()
-        plt.title(tech)
-        plt.xlabel("hour")
-        plt.ylabel("energy in GW")
-        plt.legend()
-        savefig(f"dispatch_duration_curve_{tech}")
-
-    if False:
-        data["dispatch_wind_onshore"][100:400]["ASSUME"].plot()
-        data["dispatch_entsoe"]["wind_onshore"][100:400].plot()
-
-        data["dispatch_wind_offshore"][100:1000]["ASSUME"].plot()
-        (data["assume_dispatch"]["wind_offshore"][100:1000]).plot()
-        data["dispatch_entsoe"]["wind_offshore"][100:1000].plot()
-        (data["assume_dispatch"]["wind_offshore"][100:1000]).plot()
-
-        (data["assume_dispatch"]["lignite"][100:400] * 1e0).plot()
-        data["dispatch_entsoe"]["lignite"][100:400].plot()
-
-        savefig("dispatch_wind_lignite")
     # price scatter plot
-    print(data["preis_entsoe"].index)
-    preis_entsoe = data["preis_entsoe"][from_date:to_date]
-    preis_amiris = data["preis_amiris"][from_date:to_date]
-    preis_assume = data["preis_assume"][from_date:to_date]
-    # preis_amiris = preis_amiris[preis_entsoe>=0]
-    # preis_assume = preis_assume[preis_entsoe>=0]
-    # preis_entsoe = preis_entsoe[preis_entsoe>=0]
-
-    # Pearson correlation coefficient
-    preis_entsoe = preis_entsoe.reindex(preis_amiris.index, fill_value=0)
-    corref_amiris = np.corrcoef(preis_entsoe, preis_amiris)[0, 1]
-    corref_assume = np.corrcoef(preis_entsoe, preis_assume)[0, 1]
-    print(f"CORR COEFF AMIRIS {simulation}  {corref_amiris:.4f}")
-    print(f"CORR COEFF ASSUME {simulation}  {corref_assume:.4f}")
-
-    max_entsoe = preis_entsoe.max()
-    min_entsoe = preis_entsoe.min()
-    min_entsoe = preis_amiris.min()
-    plt.figure(figsize=(8, 8))
-    plt.scatter(preis_entsoe, preis_amiris, s=8)
-    plt.scatter(preis_entsoe, preis_assume, s=8)
-    plt.plot([min_entsoe, max_entsoe], [min_entsoe, max_entsoe], "k--", linewidth=1)
-    plt.xlabel("historic price of ENTSO-E [€/MWh]")
-    plt.ylabel("simulation price at respective hour [€/MWh]")
-    plt.gca().axis("equal")
-    plt.gca().set_aspect("equal", adjustable="box")
-    plt.legend(
-        [
-            f"AMIRIS\t    corr coef: {corref_amiris:.4f}".expandtabs(),
-            f"ASSUME\t corr coef: {corref_assume:.4f}".expandtabs(),
-        ]
+    plots["price_scatter_curve"] = (
+        figures.price_density if density else figures.price_scatter,
+        preis_entsoe,
+        preis_amiris,
+        preis_assume,
+        corref_amiris,
+        corref_assume,
+    )
+    residuals = pd.concat(
+        {"AMIRIS": preis_entsoe - preis_amiris, "ASSUME": preis_entsoe - preis_assume},
+        axis=1,
+    )
+    weekly = window_statistics(residuals, ["7D"], ["mean"], rolling=False)["7D"]
+    plots["price_deviation"] = (
+        figures.price_deviation,
+        weekly["mean", "AMIRIS"],
+        weekly["mean", "ASSUME"],
     )
-    plt.yticks(np.arange(min_entsoe // 20 * 20, max_entsoe + 1 // 20 * 20, 20))
-    plt.xticks(np.arange(preis_entsoe.min() // 20 * 20, max_entsoe + 1 // 20 * 20, 20))
-    # plt.title("scatter plot of the simulation prices")
-    savefig("price_scatter_curve")
-    res_amiris = preis_entsoe - preis_amiris
-    res_assume = preis_entsoe - preis_assume
-    # res_assume = res_assume - res_assume.mean()
-    mae_amiris = abs(res_amiris)
-    mae_assume = abs(res_assume)
-    mae_assume = mae_assume.fillna(0)
-    print("MAE AMIRIS", simulation, mae_amiris.mean())
-    print("MAE ASSUME", simulation, mae_assume.mean())
-
-    print(f"mean AMIRIS {simulation}  {preis_amiris.mean():.2f}")
-    print(f"mean ASSUME {simulation}  {preis_assume.mean():.2f}")
-    print(f"mean ENTSO-E {simulation}  {preis_entsoe.mean():.2f}")
-
-    rmse_amiris = np.sqrt(((res_amiris) ** 2).fillna(0).mean())
-
-    rmse_assume = np.sqrt(((res_assume) ** 2).fillna(0).mean())
-
-    print("RMSE ASSUME", simulation, rmse_assume.mean())
-    print("RMSE AMIRIS", simulation, rmse_amiris.mean())
-
-    plt.figure(figsize=(10, 5))
-    preis_amiris.resample("7d").mean().plot()
-    preis_assume.resample("7d").mean().plot()
-    preis_entsoe.resample("7d").mean().plot()
-    plt.legend(["AMIRIS", "ASSUME", "ENTSO-E"])
-    plt.title("7d average of price")
-
-    plt.figure(figsize=(10, 5))
-    res_amiris.resample("7d").mean().plot()
-    res_assume.resample("7d").mean().plot()
-    plt.legend(["AMIRIS", "ASSUME"])
-    plt.title("7d average of price residuals to ENTSO-E")
-    plt.ylabel("price deviation in [€/MW]")
-    plt.xlabel("time")
-    savefig("price_deviation")
 
     if latex_table:
-        table_str = f"""
-                ~ & MAE & RMSE & max & min & mean & std \\\\ \hline
-                AMIRIS & {mae_amiris.mean():.2f} & {rmse_assume.mean():.2f} & {preis_amiris.max():.2f} & {preis_amiris.min():.2f} & {preis_amiris.mean():.2f} & {preis_amiris.std():.2f}\\\\ \hline
-                ASSUME & {mae_assume.mean():.2f} & {rmse_amiris.mean():.2f} & {preis_assume.max():.2f} & {preis_assume.min():.2f} & {preis_assume.mean():.2f} & {preis_assume.std():.2f}\\\\ \hline
-                Historic & 0 & 0 & {preis_entsoe.max():.2f} & {preis_entsoe.min():.2f} & {preis_entsoe.mean():.2f} & {preis_entsoe.std():.2f}\\\\
-        """
-
-        table_new = (
-            r"""
-        \\begin{table}[!ht]
-            \centering
-            \\begin{tabular}{l|l|l|l|l|l|l}%s   \end{tabular}
-            \caption{Quantitative results of the price fit towards the historic dataset of Germany 2019}
-            \label{tab:quantitative results}
-        \end{table}
-        """  # noqa: UP031
-            % table_str
-        )
-        print(table_new)
+        table = price_table(data["metrics"])
+        print(table)
         output_path = Path(base_path, "table.tex")
+        output_path.parent.mkdir(parents=True, exist_ok=True)
         with open(output_path, "w") as f:
-            f.write(table_new)
+            f.write(table)
 
     ddf = data["assume_dispatch"][4000:4500]
     ddf = ddf.reindex(
@@ -224,18 +237,7 @@ def plot_all_plots(
         axis=1,
     )
     ddf.dropna(axis=1, how="all", inplace=True)
-    base = ddf[ddf.columns[0]] * 0
-    plt.figure(figsize=(10, 5))
-    for col in ddf.columns:
-        line = base + ddf[col]
-        alpha = 0.6
-        plt.fill_between(line.index, line, base, alpha=alpha, label=col)
-        base += ddf[col]
-    plt.ylabel("Hourly dispatch power [$GW$]")
-    plt.xlabel("Datetime")
-    plt.xticks(rotation=25)
-    plt.legend()
-    savefig("overview-dispatch-assume")
+    plots["overview-dispatch-assume"] = (figures.stacked_dispatch, ddf)
 
     if "2019" in simulation:
         start = "2019-06-17"
@@ -243,40 +245,30 @@ def plot_all_plots(
 
         techs = ["nuclear", "hard coal", "lignite", "natural gas", "oil", "hydro"]
         for tech in techs:
-            plt.figure(figsize=(10, 5))
-            dispatch_entsoe = (data["dispatch_entsoe"][tech] / 1e3)[start:end].dropna()
+            if tech not in series:
+                continue
+            sample = series[tech][start:end]
+            dispatch_entsoe = sample[REFERENCE].dropna()
             if len(dispatch_entsoe) > 0:
-                data[f"dispatch_{tech}"]["AMIRIS"][start:end].plot()
-                data[f"dispatch_{tech}"]["ASSUME"][start:end].plot()
-                dispatch_entsoe.plot()
-                plt.legend(["AMIRIS", "ASSUME", "ENTSO-E"])
-                plt.xlabel("time")
-                plt.ylabel("power in MW")
-                savefig(f"sample-dispatch-{tech}")
-
-        start = "2019-01-19"
-        end = "2019-02-04"
-        plt.figure(figsize=(10, 5))
-        plt.step(preis_amiris[start:end].index, preis_amiris[start:end], linewidth=1)
-        plt.step(preis_assume[start:end].index, preis_assume[start:end], linewidth=1)
-        plt.step(preis_entsoe[start:end].index, preis_entsoe[start:end], linewidth=1)
-        plt.legend(["AMIRIS", "ASSUME", "ENTSO-E"])
-        plt.xlabel("time")
-        plt.xticks(rotation=25)
-        plt.ylabel("price in €/MW")
-        savefig("sample-price")
-
-        start = "2019-04-29"
-        end = "2019-05-13"
-        plt.figure(figsize=(10, 5))
-        plt.step(preis_amiris[start:end].index, preis_amiris[start:end], linewidth=1)
-        plt.step(preis_assume[start:end].index, preis_assume[start:end], linewidth=1)
-        plt.step(preis_entsoe[start:end].index, preis_entsoe[start:end], linewidth=1)
-        plt.xticks(rotation=25)
-        plt.legend(["AMIRIS", "ASSUME", "ENTSO-E"])
-        plt.xlabel("time")
-        plt.ylabel("price in €/MW")
-        savefig("sample-price2")
+                plots[f"sample-dispatch-{tech}"] = (
+                    figures.sample_dispatch,
+                    sample["AMIRIS"],
+                    sample["ASSUME"],
+                    dispatch_entsoe,
+                )
+
+        for name, start, end in [
+            ("sample-price", "2019-01-19", "2019-02-04"),
+            ("sample-price2", "2019-04-29", "2019-05-13"),
+        ]:
+            plots[name] = (
+                figures.sample_price,
+                preis_amiris[start:end],
+                preis_assume[start:end],
+                preis_entsoe[start:end],
+            )
+
+    return figures.render(plots, base_path, executor, file_format)
 
 
 def results_to_csv(results: dict[str, dict[str, pd.DataFrame]]):
@@ -301,31 +293,81 @@ if __name__ == "__main__":
         "amiris_germany2019",
         "amiris_austria2019",
     ]
-
-    # simulation = "amiris_germany2019"
-    # from_date = "2019-01-02"
-    # to_date = "2019-12-31"
-    # data = query_data(simulation, from_date, to_date)
-    # plot_all_plots(simulation, from_date, to_date, data)
-    results_pickle_path = Path("results.pkl")
-    if results_pickle_path.is_file():
-        with open(results_pickle_path, "rb") as f:
-            results = pickle.load(f)
-    else:
-        results = {}
-
-    for simulation in simulations:
+    parser = argparse.ArgumentParser(
+        description="Query, plot and export the results of the simulations"
+    )
+    parser.add_argument("simulations", nargs="*", default=simulations)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=figures.RENDER_WORKERS,
+        help="number of figures rendered at the same time, 1 renders them in this process",
+    )
+    parser.add_argument(
+        "--format",
+        help="file format of all figures, e.g. png, webp or pdf - by default the format of their output policy",
+    )
+    parser.add_argument(
+        "--density",
+        action="store_true",
+        help="plot the prices against the historic ones as 2D histograms instead of scatter plots",
+    )
+    parser.add_argument(
+        "--invalidate",
+        action="store_true",
+        help="remove the cached query results of the simulations first",
+    )
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    # the figures of all simulations are rendered in the background, while the next simulation is queried
+    executor = None
+    if args.workers > 1:
+        executor = ProcessPoolExecutor(
+            max_workers=args.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=figures.init_worker,
+        )
+    rendered, metrics = {}, []
+    for simulation in args.simulations:
         year = simulation[14:18]
 
         from_date = f"{year}-01-02"
         to_date = f"{year}-12-30"
-        if not results.get(simulation):
-            print(f"querying data for {simulation}")
-            data = query_data(simulation, from_date, to_date)
-            results[simulation] = data
-        plot_all_plots(simulation, from_date, to_date, results[simulation])
-
-    with open(results_pickle_path, "wb") as f:
-        pickle.dump(results, f)
-
-    results_to_csv(results)
+        if args.invalidate:
+            invalidate(simulation)
+        # query results are cached per simulation and query, so only missing ones are queried
+        data = query_data(simulation, from_date, to_date)
+        rendered[simulation] = plot_all_plots(
+            simulation,
+            from_date,
+            to_date,
+            data,
+            executor=executor,
+            file_format=args.format,
+            density=args.density,
+        )
+        results_to_csv({simulation: data})
+        metrics.append(data["metrics"])
+    if metrics:
+        # one tidy table of all evaluated simulations, e.g. for the LaTeX tables of a paper
+        pd.concat(metrics).to_csv(Path("output", "metrics.csv"), index=False)
+
+    for simulation, results in rendered.items():
+        print(simulation)
+        total_duration, total_size, skipped = 0, 0, 0
+        for name, result in results.items():
+            if result is None:
+                skipped += 1
+                continue
+            duration, size = result.result() if isinstance(result, Future) else result
+            total_duration += duration
+            total_size += size
+            print(f"  {name:<40} {size / 1e3:>8.0f} kB {duration:6.2f} s")
+        print(
+            f"  {'total':<40} {total_size / 1e3:>8.0f} kB {total_duration:6.2f} s"
+            f" - {skipped} unchanged figures skipped"
+        )
+    if executor is not None:
+        executor.shutdown()
+    print(f"total {time.perf_counter() - start:.2f} s")
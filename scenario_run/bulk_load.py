@@ -0,0 +1,142 @@
+# SPDX-FileCopyrightText: Florian Maurer
+#
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Bulk loading of the semicolon-separated AMIRIS output CSVs into typed tables via `COPY FROM STDIN`.
+The files are streamed in blocks, so that they are never held in memory as a whole.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+
+from fingerprint import write_load_run
+
+# number of output files loaded at the same time
+LOAD_WORKERS = 4
+# bytes sent to the server at once
+BLOCK_SIZE = 1 << 20
+# rows read to tell numeric from text columns
+SAMPLE_ROWS = 10_000
+
+
+def column_types(path: Path) -> dict[str, str]:
+    """
+    Returns the SQL type of each column of given AMIRIS output file.
+    Only the time steps and the ids of agents are integral - all other numeric columns are stored as double precision,
+    as their first rows may be integral while later ones are not, which would abort the `COPY` midway.
+    """
+    sample = pd.read_csv(path, sep=";", nrows=SAMPLE_ROWS)
+    types = {}
+    for column, dtype in sample.dtypes.items():
+        if column == "TimeStep":
+            # AMIRIS writes time steps like 2019-01-01_00:00:00, which PostgreSQL parses as timestamp
+            types[column] = "timestamp"
+        elif column.endswith("Id") and pd.api.types.is_integer_dtype(dtype):
+            types[column] = "bigint"
+        elif pd.api.types.is_bool_dtype(dtype):
+            types[column] = "boolean"
+        elif pd.api.types.is_numeric_dtype(dtype):
+            types[column] = "double precision"
+        else:
+            types[column] = "text"
+    return types
+
+
+def copy_from(cursor, statement: str, file) -> None:
+    """Streams given file to a `COPY ... FROM STDIN` statement with psycopg (3) or psycopg2"""
+    if hasattr(cursor, "copy_expert"):
+        cursor.copy_expert(statement, file, size=BLOCK_SIZE)
+        return
+    with cursor.copy(statement) as copy:
+        while block := file.read(BLOCK_SIZE):
+            copy.write(block)
+
+
+def copy_file(engine: Engine, path: Path, table: str) -> tuple[int, float]:
+    """
+    Replaces given table by a typed table holding the rows of the AMIRIS output file at `path`
+
+    Args:
+        engine: of the database to load into
+        path: of the semicolon-separated output file
+        table: schema-qualified name of the table to create
+
+    Returns:
+        number of loaded rows and the duration in seconds
+    """
+    start = time.perf_counter()
+    columns = ", ".join(f'"{name}" {kind}' for name, kind in column_types(path).items())
+    conn = engine.raw_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(f"DROP TABLE IF EXISTS {table}")
+        cursor.execute(f"CREATE TABLE {table} ({columns})")
+        with open(path, "rb") as file:
+            copy_from(
+                cursor,
+                f"COPY {table} FROM STDIN (FORMAT csv, DELIMITER ';', HEADER true)",
+                file,
+            )
+        rows = cursor.rowcount
+        # all queries select ranges of time steps
+        cursor.execute(f'CREATE INDEX ON {table} ("TimeStep")')
+        conn.commit()
+    finally:
+        conn.close()
+    return rows, time.perf_counter() - start
+
+
+def load_outputs(
+    engine: Engine,
+    output_path: Path,
+    schema: str,
+    workers: int = LOAD_WORKERS,
+    only_missing: bool = False,
+) -> int:
+    """
+    Loads all AMIRIS output files in given directory concurrently into tables of given schema, one per file
+
+    Args:
+        engine: of the database to load into
+        output_path: directory with the AMIRIS output CSVs
+        schema: to create the tables in, created if missing - also the name of the simulation, whose load run is
+            recorded if any file was loaded
+        workers: number of files loaded at the same time
+        only_missing: if True, files whose table exists already are not loaded again
+
+    Returns:
+        total number of loaded rows
+    """
+    with engine.begin() as conn:
+        conn.execute(text(f"create schema if not exists {schema}"))
+
+    start = time.perf_counter()
+    files = sorted(output_path.glob("*.csv"))
+    if only_missing:
+        # tables are created and filled in one transaction, so existing tables are complete
+        existing = set(inspect(engine).get_table_names(schema=schema))
+        files = [path for path in files if path.stem.lower()[:63] not in existing]
+    if files:
+        write_load_run(engine, schema, "AMIRIS", loaded=False)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            path: executor.submit(
+                copy_file, engine, path, f"{schema}.{path.stem.lower()[:63]}"
+            )
+            for path in files
+        }
+        results = {path: future.result() for path, future in futures.items()}
+    if files:
+        write_load_run(engine, schema, "AMIRIS", loaded=True)
+    for path, (rows, duration) in results.items():
+        print(f"  {path.name:<40} {rows:>10} rows {rows / duration:>12,.0f} rows/s")
+    total = sum(rows for rows, _ in results.values())
+    duration = time.perf_counter() - start
+    print(f"  {'total':<40} {total:>10} rows {total / duration:>12,.0f} rows/s")
+    return total
@@ -0,0 +1,88 @@
+# SPDX-FileCopyrightText: Florian Maurer
+#
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Content-addressed cache of query results, stored as one Parquet file per simulation and query.
+The name of each file contains a hash of the query text, its parameters and a fingerprint of the source tables - the
+load runs recorded by amiris_run.py and local_db.py - so that changed queries or reloaded data never hit outdated entries.
+Results are looked up before any query is built, so that a simulation whose results are all cached reads only its
+fingerprint from the database.
+"""
+
+import hashlib
+import json
+import shutil
+from collections.abc import Callable
+from pathlib import Path
+
+import pandas as pd
+
+CACHE_PATH = Path("output", "cache")
+
+
+def write_parquet(frame: pd.DataFrame, path: Path) -> None:
+    """Writes given frame to `path` via a temporary file, so that concurrent readers never see partial files"""
+    temporary = path.with_suffix(".tmp")
+    frame.to_parquet(temporary)
+    temporary.replace(path)
+
+
+def cache_key(query, params: dict, fingerprint: str) -> str:
+    """Returns the hash identifying the result of given query, parameters and source table fingerprint"""
+    content = json.dumps([str(query), params, fingerprint], sort_keys=True, default=str)
+    return hashlib.sha256(content.encode("utf8")).hexdigest()[:24]
+
+
+def read_cached(
+    keys: dict[str, tuple[str, dict]],
+    run: Callable[[list[str]], dict[str, pd.DataFrame]],
+    simulation: str,
+    fingerprint: str | None,
+) -> dict[str, pd.DataFrame]:
+    """
+    Returns the results of given queries from the cache of the simulation and runs only the queries that are missing
+
+    Args:
+        keys: what identifies the result of each query - its statement template and parameters - by its name
+        run: returns the results of the queries of given names, only called if any is missing
+        simulation: whose cache is used
+        fingerprint: of the source tables of the queries - if None, the sources are unknown, so that all queries run
+            and their results are not cached
+
+    Returns:
+        result of each query by its name
+    """
+    if fingerprint is None:
+        print("  outputs of unknown load runs are not cached")
+        return run(list(keys))
+    directory = Path(CACHE_PATH, simulation)
+    results, paths = {}, {}
+    for name, (query, params) in keys.items():
+        path = Path(
+            directory, f"{name}-{cache_key(query, params, fingerprint)}.parquet"
+        )
+        if path.is_file():
+            results[name] = pd.read_parquet(path)
+        else:
+            paths[name] = path
+    if not paths:
+        return results
+
+    print(f"  {len(results)} of {len(keys)} queries read from cache")
+    directory.mkdir(parents=True, exist_ok=True)
+    for name, result in run(list(paths)).items():
+        # outdated entries of the query are replaced
+        for outdated in directory.glob(f"{name}-*.parquet"):
+            outdated.unlink()
+        write_parquet(result, paths[name])
+        results[name] = result
+    return results
+
+
+def invalidate(simulation: str | None = None) -> None:
+    """Removes the cached results of given simulation, or of all simulations if None is given"""
+    shutil.rmtree(
+        CACHE_PATH if simulation is None else Path(CACHE_PATH, simulation),
+        ignore_errors=True,
+    )
@@ -0,0 +1,163 @@
+# SPDX-FileCopyrightText: Florian Maurer
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import re
+import resource
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+import pandas as pd
+from sqlalchemy import create_engine, make_url
+from sqlalchemy.engine import Engine
+from sqlalchemy.sql.elements import TextClause
+
+# number of queries of one simulation that are run concurrently
+QUERY_WORKERS = 8
+# rows fetched at once by the streamed unit-level queries
+CHUNK_SIZE = 50_000
+# unquoted SQL identifiers, which are the only values formatted into statements
+IDENTIFIER = re.compile(r"[A-Za-z_][A-Za-z0-9_]*")
+
+
+@lru_cache
+def get_engine(uri: str, pool_size: int = QUERY_WORKERS) -> Engine:
+    """
+    Returns a pooled engine for given uri, which is shared by all queries of this process.
+    With the psycopg (3) driver, every statement is prepared on its first execution on a connection, so that the
+    pooled connections reuse the statements and their plans across simulations.
+    """
+    connect_args = {}
+    url = make_url(uri)
+    if url.get_driver_name() == "psycopg":
+        connect_args["prepare_threshold"] = 0
+    elif url.get_backend_name() == "duckdb":
+        # local files built by local_db.py are only read, so that several evaluations may run at once
+        connect_args["read_only"] = True
+    return create_engine(
+        uri,
+        pool_size=pool_size,
+        max_overflow=0,
+        pool_pre_ping=True,
+        connect_args=connect_args,
+    )
+
+
+def identifier(name: str) -> str:
+    """
+    Returns given name if it may be formatted into a statement as unquoted SQL identifier
+
+    Raises:
+        ValueError: if the name is no valid identifier
+    """
+    if not IDENTIFIER.fullmatch(name):
+        raise ValueError(f"'{name}' is no valid SQL identifier")
+    return name
+
+
+def hourly_mean(chunks) -> tuple[pd.DataFrame, int]:
+    """
+    Aggregates a stream of frames indexed by time to their hourly mean, holding only one chunk at a time
+
+    Args:
+        chunks: iterable of frames, e.g. from `pd.read_sql(..., chunksize=...)`
+
+    Returns:
+        hourly mean of all chunks and the peak memory in bytes held while aggregating
+    """
+    sums, counts = [], []
+    held, peak = 0, 0
+    for chunk in chunks:
+        hours = chunk.groupby(chunk.index.floor("1h"))
+        sums.append(hours.sum(min_count=1))
+        counts.append(hours.count())
+        held += sums[-1].memory_usage().sum() + counts[-1].memory_usage().sum()
+        peak = max(peak, held + chunk.memory_usage(deep=True).sum())
+    if not sums:
+        return pd.DataFrame(), peak
+    # an hour may be split between two chunks, so the partial aggregates are combined
+    total = pd.concat(sums).groupby(level=0).sum(min_count=1)
+    count = pd.concat(counts).groupby(level=0).sum()
+    return total / count, peak
+
+
+def read_timed(
+    query: TextClause,
+    params: dict,
+    uri: str,
+    pool_size: int,
+    chunksize: int | None = None,
+) -> tuple[pd.DataFrame, float, int]:
+    """
+    Reads given query from the database at `uri`
+
+    Args:
+        query: to be read, selecting a "time" column
+        params: values bound to the parameters of the query
+        uri: of the database
+        pool_size: of the engine used for `uri`
+        chunksize: if given, rows are streamed from a server-side cursor in chunks of this size and aggregated to
+            their hourly mean on the fly, so that memory is bounded by the chunk size instead of the result size
+
+    Returns:
+        result of the query, the duration in seconds and the peak memory in bytes held by the result
+    """
+    start = time.perf_counter()
+    engine = get_engine(uri, pool_size)
+    if chunksize is None:
+        result = pd.read_sql(
+            query, engine, params=params, index_col="time", parse_dates="time"
+        )
+        peak = result.memory_usage(deep=True).sum()
+    else:
+        with engine.connect().execution_options(
+            stream_results=True, max_row_buffer=chunksize
+        ) as conn:
+            chunks = pd.read_sql(
+                query,
+                conn,
+                params=params,
+                index_col="time",
+                parse_dates="time",
+                chunksize=chunksize,
+            )
+            result, peak = hourly_mean(chunks)
+    return result, time.perf_counter() - start, peak
+
+
+def read_all(
+    queries: dict[str, tuple[TextClause, dict, str, int | None]],
+    workers: int = QUERY_WORKERS,
+) -> dict[str, pd.DataFrame]:
+    """
+    Runs independent queries concurrently and prints the duration and peak memory of each
+
+    Args:
+        queries: query, its parameters, database uri and chunk size (None to read at once) by name
+        workers: number of queries run at the same time - also the pool size of each engine
+
+    Returns:
+        result of each query by its name
+    """
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            name: executor.submit(read_timed, query, params, uri, workers, chunksize)
+            for name, (query, params, uri, chunksize) in queries.items()
+        }
+        results = {name: future.result() for name, future in futures.items()}
+    for name, (_, duration, peak) in results.items():
+        print(f"  {name:<24} {duration:6.2f} s {peak / 1e6:8.1f} MB")
+    max_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3
+    print(
+        f"  {'total':<24} {time.perf_counter() - start:6.2f} s"
+        f" - process peak {max_rss_mb:.0f} MB"
+    )
+    return {name: result for name, (result, _, _) in results.items()}
+
+
+def read_values(query: TextClause, params: dict, uri: str) -> list[str]:
+    """Returns the values of the single column selected by given query"""
+    with get_engine(uri).connect() as conn:
+        return list(conn.execute(query, params).scalars())
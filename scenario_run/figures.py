@@ -0,0 +1,315 @@
+# SPDX-FileCopyrightText: Florian Maurer
+#
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Figures of the evaluation, each drawn from only the slices of the data it shows and saved according to its
+output policy, e.g. with rasterized dense artists.
+The figures are independent of each other, so that `render` may farm them out to a process pool.
+Each figure is only rendered again if its code or the data it is rendered from changed.
+"""
+
+import hashlib
+import inspect
+import os
+import time
+from concurrent.futures import Executor, Future
+from pathlib import Path
+from typing import NamedTuple
+
+import matplotlib
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+from matplotlib.artist import Artist
+from matplotlib.collections import Collection
+from matplotlib.lines import Line2D
+
+# number of figures rendered at the same time
+RENDER_WORKERS = os.cpu_count() or 1
+# folder next to the figures holding the hashes they were rendered from
+HASH_FOLDER = ".hashes"
+
+plt.style.use("seaborn-v0_8")
+
+
+def init_worker() -> None:
+    """Renders without display in the processes of the pool"""
+    matplotlib.use("Agg")
+
+
+class OutputPolicy(NamedTuple):
+    """How a figure is saved"""
+
+    # file format, e.g. "svg", "pdf", "png" or "webp"
+    format: str = "svg"
+    # artists with more points are rasterized in vector formats, while axes and text stay vectors - None keeps all
+    rasterize_above: int | None = None
+    # resolution of raster formats and rasterized artists
+    dpi: int = 150
+
+
+# for artists with thousands of markers or cells, like scatter plots and 2D histograms
+DENSE = OutputPolicy(rasterize_above=1000)
+
+
+def artist_size(artist: Artist) -> int:
+    """Returns the number of points drawn by given artist"""
+    if isinstance(artist, Line2D):
+        return len(artist.get_xdata())
+    if isinstance(artist, Collection):
+        # scatter plots draw one marker path at many offsets, filled areas and meshes draw many paths
+        vertices = sum(len(path.vertices) for path in artist.get_paths())
+        return max(len(artist.get_offsets()), vertices)
+    return 0
+
+
+def savefig(path: Path, policy: OutputPolicy) -> None:
+    """Saves the current figure to given path according to the policy and closes it"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    figure = plt.gcf()
+    if policy.rasterize_above is not None:
+        for axes in figure.axes:
+            for artist in [*axes.lines, *axes.collections]:
+                if artist_size(artist) > policy.rasterize_above:
+                    artist.set_rasterized(True)
+    plt.savefig(path, transparent=False, bbox_inches="tight", dpi=policy.dpi)
+    plt.close()
+
+
+def price_duration_curve(
+    amiris: pd.Series, assume: pd.Series, entsoe: pd.Series
+) -> None:
+    plt.figure(figsize=(10, 5))
+    amiris.plot()
+    assume.plot()
+    entsoe.plot()
+    plt.xlabel("hours")
+    plt.ylabel("price in [€/MW]")
+    plt.legend(["AMIRIS", "ASSUME", "ENTSO-E"])
+
+
+def dispatch_duration_curve(
+    tech: str, entsoe: pd.Series, amiris: pd.Series, assume: pd.Series
+) -> None:
+    plt.figure(figsize=(10, 5))
+    (entsoe / 1e6).plot()
+    (amiris / 1e6).plot()
+    (assume / 1e6).plot()
+    plt.title(tech)
+    plt.xlabel("hour")
+    plt.ylabel("energy in GW")
+    plt.legend()
+
+
+def price_scatter(
+    entsoe: pd.Series,
+    amiris: pd.Series,
+    assume: pd.Series,
+    corref_amiris: float,
+    corref_assume: float,
+) -> None:
+    max_entsoe = entsoe.max()
+    min_entsoe = entsoe.min()
+    min_entsoe = amiris.min()
+    plt.figure(figsize=(8, 8))
+    plt.scatter(entsoe, amiris, s=8)
+    plt.scatter(entsoe, assume, s=8)
+    plt.plot([min_entsoe, max_entsoe], [min_entsoe, max_entsoe], "k--", linewidth=1)
+    plt.xlabel("historic price of ENTSO-E [€/MWh]")
+    plt.ylabel("simulation price at respective hour [€/MWh]")
+    plt.gca().axis("equal")
+    plt.gca().set_aspect("equal", adjustable="box")
+    plt.legend(
+        [
+            f"AMIRIS\t    corr coef: {corref_amiris:.4f}".expandtabs(),
+            f"ASSUME\t corr coef: {corref_assume:.4f}".expandtabs(),
+        ]
+    )
+    plt.yticks(np.arange(min_entsoe // 20 * 20, max_entsoe + 1 // 20 * 20, 20))
+    plt.xticks(np.arange(entsoe.min() // 20 * 20, max_entsoe + 1 // 20 * 20, 20))
+    # plt.title("scatter plot of the simulation prices")
+
+
+def price_deviation(res_amiris: pd.Series, res_assume: pd.Series) -> None:
+    """Plots the given weekly means of the price residuals"""
+    plt.figure(figsize=(10, 5))
+    res_amiris.plot()
+    res_assume.plot()
+    plt.legend(["AMIRIS", "ASSUME"])
+    plt.title("7d average of price residuals to ENTSO-E")
+    plt.ylabel("price deviation in [€/MW]")
+    plt.xlabel("time")
+
+
+def stacked_dispatch(ddf: pd.DataFrame) -> None:
+    base = ddf[ddf.columns[0]] * 0
+    plt.figure(figsize=(10, 5))
+    for col in ddf.columns:
+        line = base + ddf[col]
+        alpha = 0.6
+        plt.fill_between(line.index, line, base, alpha=alpha, label=col)
+        base += ddf[col]
+    plt.ylabel("Hourly dispatch power [$GW$]")
+    plt.xlabel("Datetime")
+    plt.xticks(rotation=25)
+    plt.legend()
+
+
+def sample_dispatch(amiris: pd.Series, assume: pd.Series, entsoe: pd.Series) -> None:
+    plt.figure(figsize=(10, 5))
+    amiris.plot()
+    assume.plot()
+    entsoe.plot()
+    plt.legend(["AMIRIS", "ASSUME", "ENTSO-E"])
+    plt.xlabel("time")
+    plt.ylabel("power in MW")
+
+
+def sample_price(amiris: pd.Series, assume: pd.Series, entsoe: pd.Series) -> None:
+    plt.figure(figsize=(10, 5))
+    plt.step(amiris.index, amiris, linewidth=1)
+    plt.step(assume.index, assume, linewidth=1)
+    plt.step(entsoe.index, entsoe, linewidth=1)
+    plt.legend(["AMIRIS", "ASSUME", "ENTSO-E"])
+    plt.xlabel("time")
+    plt.xticks(rotation=25)
+    plt.ylabel("price in €/MW")
+
+
+def price_density(
+    entsoe: pd.Series,
+    amiris: pd.Series,
+    assume: pd.Series,
+    corref_amiris: float,
+    corref_assume: float,
+    bins: int = 100,
+) -> None:
+    """Plots the joint distribution of historic and simulated prices as 2D histograms instead of one marker per hour"""
+    values = pd.concat([entsoe, amiris, assume])
+    edges = np.linspace(values.min(), values.max(), bins + 1)
+    _, axes = plt.subplots(1, 2, figsize=(12, 6), sharex=True, sharey=True)
+    for ax, (model, prices, corref) in zip(
+        axes,
+        [("AMIRIS", amiris, corref_amiris), ("ASSUME", assume, corref_assume)],
+    ):
+        valid = prices.notna() & entsoe.notna()
+        counts, _, _ = np.histogram2d(entsoe[valid], prices[valid], bins=[edges, edges])
+        mesh = ax.pcolormesh(
+            edges, edges, np.ma.masked_equal(counts.T, 0), cmap="viridis"
+        )
+        ax.plot(edges[[0, -1]], edges[[0, -1]], "k--", linewidth=1)
+        ax.set_title(f"{model} - corr coef: {corref:.4f}")
+        ax.set_xlabel("historic price of ENTSO-E [€/MWh]")
+        ax.set_aspect("equal", adjustable="box")
+    axes[0].set_ylabel("simulation price at respective hour [€/MWh]")
+    plt.colorbar(mesh, ax=axes, label="hours")
+
+
+# figures without entry are saved as plain SVG - lines like the duration curves are simplified by matplotlib already
+POLICIES = {
+    price_scatter: DENSE,
+    price_density: DENSE,
+}
+
+
+def figure_hash(figure, policy: OutputPolicy, *args) -> str:
+    """
+    Returns a hash of the code of given figure function, its output policy and the data it is rendered from
+
+    Args:
+        figure: function drawing the figure
+        policy: the figure is saved with
+        args: of the figure function - series, frames, arrays or values with a stable repr
+
+    Returns:
+        hex digest of the hash
+    """
+    digest = hashlib.sha256()
+    # changes to the figure function, the saving of the figures - including which artists are rasterized - or
+    # matplotlib itself change the rendered file
+    for code in [
+        inspect.getsource(figure),
+        inspect.getsource(savefig),
+        inspect.getsource(artist_size),
+        matplotlib.__version__,
+        repr(policy),
+    ]:
+        digest.update(code.encode("utf8"))
+    for arg in args:
+        if isinstance(arg, pd.Series | pd.DataFrame):
+            digest.update(
+                pd.util.hash_pandas_object(arg, index=True).to_numpy().tobytes()
+            )
+            names = arg.columns if isinstance(arg, pd.DataFrame) else [arg.name]
+            digest.update(repr(list(names)).encode("utf8"))
+        elif isinstance(arg, np.ndarray):
+            digest.update(arg.tobytes())
+        else:
+            digest.update(repr(arg).encode("utf8"))
+    return digest.hexdigest()
+
+
+def hash_path(path: Path) -> Path:
+    """Returns the path of the file holding the hash of the figure at given path"""
+    return Path(path.parent, HASH_FOLDER, f"{path.name}.sha256")
+
+
+def timed_figure(
+    figure, path: Path, policy: OutputPolicy, hash_: str, *args
+) -> tuple[float, int]:
+    """
+    Draws given figure, saves it to `path` and stores its hash
+
+    Returns:
+        duration in seconds and size of the file in bytes
+    """
+    start = time.perf_counter()
+    figure(*args)
+    savefig(path, policy)
+    # the hash is only stored once the figure is complete
+    hash_path(path).parent.mkdir(parents=True, exist_ok=True)
+    hash_path(path).write_text(hash_)
+    return time.perf_counter() - start, path.stat().st_size
+
+
+def render(
+    figures: dict[str, tuple],
+    base_path: Path,
+    executor: Executor | None = None,
+    file_format: str | None = None,
+) -> dict[str, Future | tuple[float, int] | None]:
+    """
+    Renders given figures into `base_path` according to their `POLICIES` - figures whose code and data did not change
+    since they were rendered last are skipped
+
+    Args:
+        figures: figure function and its arguments by file name, e.g.
+            {"price_duration_curve": (price_duration_curve, amiris, assume, entsoe)}
+        base_path: directory of the files
+        executor: to submit the figures to - if None, they are rendered one after another in this process
+        file_format: of all figures, e.g. "png" - if None, the format of their policy is used
+
+    Returns:
+        future of the render duration in seconds and file size in bytes by file name - or these themselves if rendered
+        in this process, None if the figure was skipped
+    """
+    results = {}
+    for name, (figure, *args) in figures.items():
+        policy = POLICIES.get(figure, OutputPolicy())
+        if file_format is not None:
+            policy = policy._replace(format=file_format)
+        path = Path(base_path, f"{name}.{policy.format}")
+        hash_ = figure_hash(figure, policy, *args)
+        stored = hash_path(path)
+        if path.is_file() and stored.is_file() and stored.read_text() == hash_:
+            results[name] = None
+            continue
+        stored.unlink(missing_ok=True)
+        if executor is None:
+            results[name] = timed_figure(figure, path, policy, hash_, *args)
+        else:
+            results[name] = executor.submit(
+                timed_figure, figure, path, policy, hash_, *args
+            )
+    return results
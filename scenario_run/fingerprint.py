@@ -0,0 +1,146 @@
+# SPDX-FileCopyrightText: Florian Maurer
+#
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Fingerprints of the inputs of scenario runs, so that runs whose inputs did not change can be skipped.
+AMIRIS fingerprints are stored in the output directory of a run, ASSUME fingerprints in the database.
+Every load of outputs into the database is recorded with a new id in the `load_runs` table, which keys the cached
+query results of a simulation, so that reloaded outputs never hit results cached before.
+"""
+
+import hashlib
+import uuid
+from importlib.metadata import PackageNotFoundError, version
+from pathlib import Path
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+
+FINGERPRINT_FILE = "fingerprint.txt"
+BLOCK_SIZE = 1 << 20
+# fingerprint of the inputs of the last complete ASSUME run of each simulation
+RUN_FINGERPRINTS_TABLE = """
+CREATE TABLE IF NOT EXISTS run_fingerprints (simulation text PRIMARY KEY, fingerprint text)
+"""
+# one row per simulation and model whose outputs were loaded
+LOAD_RUNS_TABLE = """
+CREATE TABLE IF NOT EXISTS load_runs
+(simulation text, model text, run_id text, loaded_at timestamp, PRIMARY KEY (simulation, model))
+"""
+
+
+def fingerprint(scenario_path: Path, *versions: str) -> str:
+    """
+    Returns a hash of all files in the scenario directory - the scenario.yaml and its time series - and given versions
+
+    Args:
+        scenario_path: directory of the scenario
+        versions: of the models the scenario is run with
+
+    Returns:
+        hex digest of the hash
+    """
+    digest = hashlib.sha256()
+    for version_ in versions:
+        digest.update(version_.encode("utf8"))
+    for path in sorted(p for p in Path(scenario_path).rglob("*") if p.is_file()):
+        digest.update(path.relative_to(scenario_path).as_posix().encode("utf8"))
+        with open(path, "rb") as file:
+            while block := file.read(BLOCK_SIZE):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def assume_version() -> str:
+    """Returns the installed version of ASSUME"""
+    try:
+        return version("assume-framework")
+    except PackageNotFoundError:
+        return "unknown"
+
+
+def read_output_fingerprint(output_path: Path) -> str | None:
+    """Returns the fingerprint stored in the output directory of a run, or None if there is none"""
+    path = Path(output_path, FINGERPRINT_FILE)
+    return path.read_text().strip() if path.is_file() else None
+
+
+def write_output_fingerprint(output_path: Path, value: str | None) -> None:
+    """Stores the fingerprint in the output directory of a run, or removes it if None is given"""
+    path = Path(output_path, FINGERPRINT_FILE)
+    if value is None:
+        path.unlink(missing_ok=True)
+        return
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(value)
+
+
+def read_db_fingerprint(engine: Engine, simulation: str) -> str | None:
+    """Returns the fingerprint stored for the simulation in the database, or None if there is none"""
+    with engine.begin() as conn:
+        conn.execute(text(RUN_FINGERPRINTS_TABLE))
+        return conn.execute(
+            text(
+                "SELECT fingerprint FROM run_fingerprints WHERE simulation = :simulation"
+            ),
+            {"simulation": simulation},
+        ).scalar()
+
+
+def write_db_fingerprint(engine: Engine, simulation: str, value: str | None) -> None:
+    """Stores the fingerprint of the simulation in the database, replacing a previous one, or removes it if None is given"""
+    with engine.begin() as conn:
+        conn.execute(text(RUN_FINGERPRINTS_TABLE))
+        conn.execute(
+            text("DELETE FROM run_fingerprints WHERE simulation = :simulation"),
+            {"simulation": simulation},
+        )
+        if value is None:
+            return
+        conn.execute(
+            text("INSERT INTO run_fingerprints VALUES (:simulation, :fingerprint)"),
+            {"simulation": simulation, "fingerprint": value},
+        )
+
+
+def write_load_run(engine: Engine, simulation: str, model: str, loaded: bool) -> None:
+    """
+    Records that the outputs of given model were loaded for the simulation, replacing its previous load run
+
+    Args:
+        engine: of the database the outputs were loaded into
+        simulation: whose outputs were loaded, e.g. "amiris_germany2019"
+        model: whose outputs were loaded, i.e. "AMIRIS" or "ASSUME"
+        loaded: if False, only the previous load run is removed - to be called before a load starts, so that
+            results cached from outputs that are being replaced are never read again
+    """
+    with engine.begin() as conn:
+        conn.execute(text(LOAD_RUNS_TABLE))
+        conn.execute(
+            text(
+                "DELETE FROM load_runs WHERE simulation = :simulation AND model = :model"
+            ),
+            {"simulation": simulation, "model": model},
+        )
+        if loaded:
+            conn.execute(
+                text(
+                    "INSERT INTO load_runs VALUES (:simulation, :model, :run_id, CURRENT_TIMESTAMP)"
+                ),
+                {"simulation": simulation, "model": model, "run_id": uuid.uuid4().hex},
+            )
+
+
+def read_load_runs(engine: Engine, simulation: str) -> dict[str, str]:
+    """Returns the ids of the load runs of the simulation by model - empty if none were recorded"""
+    if not inspect(engine).has_table("load_runs"):
+        return {}
+    with engine.connect() as conn:
+        rows = conn.execute(
+            text(
+                "SELECT model, run_id FROM load_runs WHERE simulation = :simulation ORDER BY model"
+            ),
+            {"simulation": simulation},
+        ).all()
+    return dict(rows)
@@ -0,0 +1,130 @@
+# SPDX-FileCopyrightText: Florian Maurer
+#
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Historical ENTSO-E data, which is the same for all simulations of the same countries and year.
+It is queried by whole years and cached on disk as Parquet, so that the ENTSO-E database is queried only once
+per countries and year. Delete the files in `CACHE_PATH` to query the data again.
+"""
+
+from functools import lru_cache
+from pathlib import Path
+
+import pandas as pd
+from sqlalchemy import bindparam, text
+from sqlalchemy.sql.elements import TextClause
+
+from cache import write_parquet
+from config import entsoe_uri
+from database import QUERY_WORKERS, read_all
+
+CACHE_PATH = Path("output", "entsoe")
+
+HISTORICAL_CATALOG = {
+    "entsoe_dispatch": """
+    SELECT
+    public.time_bucket('3600.000s',index) AS "time",
+    avg(nuclear*1e3) as nuclear,
+    avg("fossil_hard_coal"*1e3) as coal,
+    avg(("hydro_run-of-river_and_poundage"+hydro_water_reservoir)*1e3) as hydro,
+    avg(biomass*1e3) as bio,
+    avg(("fossil_coal-derived_gas"+"fossil_gas")*1e3) as "natural gas",
+    avg("fossil_brown_coal/lignite" *1e3) as lignite,
+    avg((fossil_oil+coalesce(fossil_oil_shale,0)+coalesce(fossil_peat,0))*1e3) as oil,
+    avg(("fossil_hard_coal")*1e3) as "hard coal",
+    avg(("wind_offshore")*1e3) as wind_offshore,
+    avg(("wind_onshore")*1e3) as wind_onshore,
+    avg(solar*1e3) as solar,
+    avg((hydro_pumped_storage*1e3)) as "storage",
+    avg((geothermal+other+waste)*1e3) as others
+    FROM query_generation
+    WHERE
+    index >= :from_date AND index < :to_date AND
+    country in :countries
+    GROUP BY 1
+    ORDER BY 1
+    """,
+    "entsoe_price": """
+    SELECT public.time_bucket('3600.000s',index) AS "time",
+    avg("0") AS "entsoe_price"
+    FROM query_day_ahead_prices
+    WHERE
+    index >= :from_date AND index < :to_date AND
+    country in :countries
+    GROUP BY 1
+    ORDER BY 1
+    """,
+}
+
+
+@lru_cache
+def historical_statement(name: str) -> TextClause:
+    """Returns the statement of given name from the `HISTORICAL_CATALOG`, with the countries as list parameter"""
+    return text(HISTORICAL_CATALOG[name]).bindparams(
+        bindparam("countries", expanding=True)
+    )
+
+
+def cache_file(name: str, countries: tuple[str, ...], year: int) -> Path:
+    """Returns the path of the file caching the data of given query, countries and year"""
+    return Path(CACHE_PATH, f"{name}_{'+'.join(sorted(countries))}_{year}.parquet")
+
+
+def fetch_years(
+    countries: tuple[str, ...], years: list[int], workers: int = QUERY_WORKERS
+) -> None:
+    """Queries the historical data of given years which is not cached yet and caches it"""
+    queries = {}
+    for year in years:
+        params = {
+            "from_date": f"{year}-01-01",
+            "to_date": f"{year + 1}-01-01",
+            "countries": list(countries),
+        }
+        for name in HISTORICAL_CATALOG:
+            if not cache_file(name, countries, year).is_file():
+                queries[f"{name} {year}"] = (
+                    historical_statement(name),
+                    params,
+                    entsoe_uri,
+                    None,
+                )
+    if not queries:
+        return
+    CACHE_PATH.mkdir(parents=True, exist_ok=True)
+    for key, result in read_all(queries, workers).items():
+        name, year = key.split(" ")
+        write_parquet(result, cache_file(name, countries, int(year)))
+
+
+def historical_data(
+    countries: tuple[str, ...],
+    from_date: str,
+    to_date: str,
+    workers: int = QUERY_WORKERS,
+) -> dict[str, pd.DataFrame]:
+    """
+    Returns the hourly historical generation and day-ahead prices of given countries, from the cache if possible
+
+    Args:
+        countries: ENTSO-E country codes whose data is aggregated
+        from_date: first hour to return
+        to_date: last hour to return
+        workers: number of queries run concurrently if data has to be queried
+
+    Returns:
+        frame of each query in the `HISTORICAL_CATALOG` by its name
+    """
+    start, end = pd.Timestamp(from_date), pd.Timestamp(to_date)
+    years = list(range(start.year, end.year + 1))
+    fetch_years(countries, years, workers)
+
+    data = {}
+    for name in HISTORICAL_CATALOG:
+        frame = pd.concat(
+            [pd.read_parquet(cache_file(name, countries, year)) for year in years]
+        )
+        tz = frame.index.tz
+        data[name] = frame.loc[pd.Timestamp(start, tz=tz) : pd.Timestamp(end, tz=tz)]
+    return data
@@ -0,0 +1,204 @@
+# SPDX-FileCopyrightText: Florian Maurer
+#
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Builds a local DuckDB file, on which the queries of queries.py run without PostgreSQL/TimescaleDB, run as:
+`python local_db.py local.duckdb --scenario Germany2019 [--scenario ...] [--export-from URI] [--entsoe-from URI]`
+Afterwards, set `db_uri` and `entsoe_uri` in config.py to "duckdb:///local.duckdb".
+"""
+
+import argparse
+import time
+import uuid
+from pathlib import Path
+
+import duckdb
+import pandas as pd
+from sqlalchemy import MetaData, Table, bindparam, create_engine, text
+
+from fingerprint import LOAD_RUNS_TABLE
+
+# tables written by ASSUME, exported for the selected simulations
+ASSUME_TABLES = [
+    "unit_dispatch",
+    "market_dispatch",
+    "market_orders",
+    "market_meta",
+    "power_plant_meta",
+]
+# tables of the ENTSO-E database, exported for the years of the selected simulations
+ENTSOE_TABLES = {"query_generation": "index", "query_day_ahead_prices": "index"}
+EXPORT_CHUNK_SIZE = 100_000
+
+# TimescaleDB's time_bucket is emulated by DuckDB's own, which supports the same arguments
+TIME_BUCKET_MACRO = """
+CREATE OR REPLACE MACRO public.time_bucket(width, ts) AS
+system.main.time_bucket(width::INTERVAL, ts)
+"""
+
+
+def create_local_db(path: Path) -> duckdb.DuckDBPyConnection:
+    """Opens the DuckDB file at given path and creates the functions used by the queries"""
+    conn = duckdb.connect(str(path))
+    conn.execute("CREATE SCHEMA IF NOT EXISTS public")
+    conn.execute(TIME_BUCKET_MACRO)
+    return conn
+
+
+def record_load_run(
+    conn: duckdb.DuckDBPyConnection, simulation: str, model: str
+) -> None:
+    """Records a new load run of the outputs of given model for the simulation, as `fingerprint.write_load_run`"""
+    conn.execute(LOAD_RUNS_TABLE)
+    conn.execute(
+        "DELETE FROM load_runs WHERE simulation = ? AND model = ?", [simulation, model]
+    )
+    conn.execute(
+        "INSERT INTO load_runs VALUES (?, ?, ?, CURRENT_TIMESTAMP)",
+        [simulation, model, uuid.uuid4().hex],
+    )
+
+
+def load_amiris_outputs(
+    conn: duckdb.DuckDBPyConnection, scenario: str, output_path: Path = Path("scenario")
+) -> int:
+    """
+    Loads the AMIRIS output CSVs of given scenario into the schema `amiris_<scenario>`, as amiris_run.py does
+
+    Returns:
+        number of loaded rows
+    """
+    schema = f"amiris_{scenario.lower()}"
+    conn.execute(f"CREATE SCHEMA IF NOT EXISTS {schema}")
+    rows = 0
+    for output_file in sorted(Path(output_path, scenario).glob("*.csv")):
+        table = f"{schema}.{output_file.stem.lower()[:63]}"
+        conn.execute(
+            f"""
+            CREATE OR REPLACE TABLE {table} AS
+            SELECT * REPLACE (strptime("TimeStep", '%Y-%m-%d_%H:%M:%S') AS "TimeStep")
+            FROM read_csv(?, delim=';', header=true, types={{'TimeStep': 'VARCHAR'}})
+            """,
+            [str(output_file)],
+        )
+        rows += conn.execute(f"SELECT count(*) FROM {table}").fetchone()[0]
+    record_load_run(conn, schema, "AMIRIS")
+    return rows
+
+
+def export_table(
+    conn: duckdb.DuckDBPyConnection,
+    source_uri: str,
+    table: str,
+    where: str,
+    params: dict,
+    replace: str,
+    replace_params: list,
+) -> int:
+    """
+    Copies the rows of a table of the database at `source_uri` matching the `where` condition into the local file.
+    The local table is created with the columns of the source table if it is missing, so that it exists even if no
+    rows match, and only its rows matching the `replace` condition are replaced - those exported before for other
+    simulations or years are kept.
+
+    Args:
+        conn: to the local file
+        source_uri: of the database to copy from
+        table: to copy, named the same in both databases
+        where: condition selecting the rows to copy, with parameters like `:simulation`
+        params: of the `where` condition by name - lists are expanded, e.g. for `IN :simulations`
+        replace: condition selecting the same rows in the local table, with positional parameters `?`
+        replace_params: of the `replace` condition
+
+    Returns:
+        number of copied rows
+    """
+    engine = create_engine(source_uri)
+    query = text(f"SELECT * FROM {table} WHERE {where}").bindparams(
+        *[
+            bindparam(key, expanding=True)
+            for key, value in params.items()
+            if isinstance(value, list)
+        ]
+    )
+    source = Table(table, MetaData(), autoload_with=engine)
+    columns = ", ".join(
+        f'"{column.name}" {column.type.compile(dialect=engine.dialect)}'
+        for column in source.columns
+    )
+    conn.execute(f"CREATE TABLE IF NOT EXISTS {table} ({columns})")
+    conn.execute(f"DELETE FROM {table} WHERE {replace}", replace_params)
+    rows = 0
+    for chunk in pd.read_sql(
+        query,
+        engine,
+        params=params,
+        chunksize=EXPORT_CHUNK_SIZE,
+    ):
+        conn.register("chunk", chunk)
+        conn.execute(f"INSERT INTO {table} BY NAME SELECT * FROM chunk")
+        conn.unregister("chunk")
+        rows += len(chunk)
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("path", type=Path, help="DuckDB file to create or update")
+    parser.add_argument(
+        "--scenario",
+        action="append",
+        default=[],
+        help="AMIRIS scenario whose outputs in ./scenario/<scenario> are loaded, e.g. Germany2019",
+    )
+    parser.add_argument(
+        "--export-from", help="uri of the database with the ASSUME results"
+    )
+    parser.add_argument("--entsoe-from", help="uri of the ENTSO-E database")
+    args = parser.parse_args()
+    if (args.export_from or args.entsoe_from) and not args.scenario:
+        parser.error("the simulations to export are selected by --scenario")
+
+    conn = create_local_db(args.path)
+    simulations = [f"amiris_{scenario.lower()}" for scenario in args.scenario]
+    for scenario in args.scenario:
+        start = time.time()
+        rows = load_amiris_outputs(conn, scenario)
+        print(f"{scenario}: loaded {rows} rows in {time.time() - start:.1f} seconds")
+
+    if args.export_from:
+        for table in ASSUME_TABLES:
+            start = time.time()
+            rows = sum(
+                export_table(
+                    conn,
+                    args.export_from,
+                    table,
+                    "simulation = :simulation",
+                    {"simulation": simulation},
+                    "simulation = ?",
+                    [simulation],
+                )
+                for simulation in simulations
+            )
+            print(f"{table}: exported {rows} rows in {time.time() - start:.1f} seconds")
+        for simulation in simulations:
+            record_load_run(conn, simulation, "ASSUME")
+
+    if args.entsoe_from:
+        years = sorted({int(simulation[-4:]) for simulation in simulations})
+        for table, column in ENTSOE_TABLES.items():
+            start = time.time()
+            dates = [f"{years[0]}-01-01", f"{years[-1] + 1}-01-01"]
+            rows = export_table(
+                conn,
+                args.entsoe_from,
+                table,
+                f"{column} >= :from_date AND {column} < :to_date",
+                {"from_date": dates[0], "to_date": dates[1]},
+                f"{column} >= ? AND {column} < ?",
+                dates,
+            )
+            print(f"{table}: exported {rows} rows in {time.time() - start:.1f} seconds")
+    conn.close()
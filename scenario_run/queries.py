@@ -2,12 +2,33 @@
 #
 # SPDX-License-Identifier: Apache-2.0
 
-from functools import lru_cache
+import json
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
 
 import pandas as pd
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
+from sqlalchemy.sql.elements import TextClause
 
-from config import db_uri, entsoe_uri
+from cache import read_cached
+from config import db_uri
+from database import (
+    CHUNK_SIZE,
+    QUERY_WORKERS,
+    get_engine,
+    identifier,
+    read_all,
+    read_values,
+)
+from fingerprint import read_load_runs
+from historical import historical_data
+
+CONVENTIONAL_TECHNOLOGIES = ["nuclear", "lignite", "hard coal", "natural gas", "oil"]
+# models whose outputs are queried, each with its own load run
+MODELS = ["ASSUME", "AMIRIS"]
+# queries with one column per value of the pivoted column, and those with fixed columns
+PIVOTING_QUERIES = ["assume_dispatch", "vre_dispatch", "conventional_dispatch"]
+QUERIES = ["amiris_storage", "assume_storage", "assume_price", "amiris_price"]
 
 ###########################
 
@@ -15,55 +36,39 @@ simulation = "amiris_germany2018"
 from_date = "2018-01-01"
 to_date = "2018-12-31"
 
-
-@lru_cache(maxsize=32)
-def query_data(simulation: str, from_date: str, to_date: str):
-    entsoe_engine = create_engine(entsoe_uri)
-    engine = create_engine(db_uri)
-
-    VALID_COUNTRY = "('DE_LU', 'DE_AT_LU')"
-    if "austria" in simulation:
-        VALID_COUNTRY = "('AT')"
-    print(simulation)
-    # assume_dispatch
-    data = {}
-    sql = f"""
+# Statements of all queries, whose values are bound as parameters.
+# Only `{schema}` - the schema of the AMIRIS outputs of a simulation - and `{pivot}` - the columns created by
+# `pivot_columns` - are formatted into them, so that the statements are the same for all simulations.
+CATALOG = {
+    "technologies": """
+    SELECT DISTINCT technology FROM power_plant_meta
+    WHERE simulation = :simulation ORDER BY 1
+    """,
+    # markets with dispatch, which need not have meta data
+    "markets": """
+    SELECT DISTINCT market_id FROM market_dispatch
+    WHERE simulation = :simulation AND "datetime" BETWEEN :from_date AND :to_date
+    ORDER BY 1
+    """,
+    # one column per market and technology, at full hours only
+    "assume_dispatch": """
     SELECT
     "datetime" as "time",
-    sum(power) AS "market_dispatch",
-    market_id,
-    um.technology
+    {pivot}
     FROM market_dispatch md
     join power_plant_meta um on um."index" = md.unit_id and um.simulation = md.simulation
     WHERE
-    "datetime" BETWEEN '{from_date}' AND '{to_date}' AND
-    md.simulation = '{simulation}'
-    GROUP BY 1, market_id, technology
-    ORDER BY technology, market_id desc, 1
-    """
-
-    assume_dispatch = pd.read_sql(sql, engine, index_col="time", parse_dates="time")
-
-    series = []
-    for label, sub_df in assume_dispatch.groupby(["market_id", "technology"]):
-        lab = "-".join(label)
-        lab = lab.replace("Market_1-", "")
-
-        # if "lignite" not in lab and "nuclear" not in lab:
-        #    continue
-        group_sum = sub_df.market_dispatch.groupby("time").sum()
-        group_sum.name = lab
-        series.append(group_sum.resample("1h").ffill())
-
-    ddf = pd.DataFrame(series)
-    ddf = ddf.T.ffill()
-
-    ddf = ddf[sorted(ddf.columns, reverse=True)]
-    ddf = ddf.fillna(0)
-    data["assume_dispatch"] = ddf * 1e3  # MW to kWh
-
-    # amiris and assume dispatch
-    query = f"""
+    "datetime" BETWEEN :from_date AND :to_date AND
+    "datetime" = public.time_bucket('3600.000s', "datetime") AND
+    md.simulation = :simulation
+    GROUP BY 1
+    ORDER BY 1
+    """,
+    # amiris and assume dispatch - summed over agents, one column per technology and model
+    "vre_dispatch": """
+    select "time",
+    {pivot}
+    from (
     select public.time_bucket('3600.000s',a."time") AS "time",
     avg("ASSUME Actual dispatch") as "ASSUME",
     avg("AMIRIS Awarded Energy") as "AMIRIS",
@@ -78,8 +83,8 @@ def query_data(simulation: str, from_date: str, to_date: str):
     unit
     FROM unit_dispatch
     WHERE
-    index BETWEEN '{from_date}' AND '{to_date}' AND
-    LOWER(simulation) = '{simulation}' AND
+    index BETWEEN :from_date AND :to_date AND
+    LOWER(simulation) = :simulation AND
     unit like 'VariableRenewableOperator_%'
     GROUP BY 1, unit, power, simulation
     ORDER BY 1) a
@@ -87,27 +92,23 @@ def query_data(simulation: str, from_date: str, to_date: str):
     "TimeStep" as "time",
     "AgentId"::text as "agent",
     avg("AwardedEnergyInMWH") as "AMIRIS Awarded Energy"
-    FROM {simulation}.VariableRenewableOperator
+    FROM {schema}.VariableRenewableOperator
     WHERE
-    "TimeStep" BETWEEN '{from_date}' AND '{to_date}'
+    "TimeStep" BETWEEN :from_date AND :to_date
     GROUP BY 1, "agent"
     ORDER BY 1) b on a.agent=b.agent and a.time=b.time
     join power_plant_meta c on a.unit = c.index and c.simulation=a.simulation
     GROUP BY 1, c.technology, a.agent
-    """
-
-    dispatch_data = pd.read_sql(
-        text(query), engine, index_col="time", parse_dates="time"
-    )
-    for technology in dispatch_data["technology"].unique():
-        dd = dispatch_data[dispatch_data["technology"] == technology]
-        del dd["agent"]
-        del dd["technology"]
-        data[f"dispatch_{technology}"] = dd.resample("1h").sum()
-
-    query = f"""
+    ) agents
+    GROUP BY 1
+    ORDER BY 1
+    """,
+    "conventional_dispatch": """
+    select "time",
+    {pivot}
+    from (
     select public.time_bucket('3600.000s',a."time") AS "time",
-    avg("ASSUME Actual dispatch") as "ASSUME", 
+    avg("ASSUME Actual dispatch") as "ASSUME",
     avg("AMIRIS Awarded Energy") as "AMIRIS",
     --avg("AMIRIS Awarded Energy"- "ASSUME Actual dispatch") as "Difference",
     a.technology,
@@ -127,8 +128,8 @@ def query_data(simulation: str, from_date: str, to_date: str):
     simulation
     FROM unit_dispatch
     WHERE
-    index BETWEEN '{from_date}' AND '{to_date}' AND
-    LOWER(simulation) = '{simulation}' AND
+    index BETWEEN :from_date AND :to_date AND
+    LOWER(simulation) = :simulation AND
     unit like 'PredefinedPlantBuilder_200%'
     GROUP BY 1, unit, power, simulation
     ORDER BY 1
@@ -143,135 +144,302 @@ def query_data(simulation: str, from_date: str, to_date: str):
     --avg("OfferedEnergyInMWH"*1e3) as "OfferedEnergyInMWH",
     --avg("ReceivedMoneyInEUR") as "ReceivedMoneyInEUR",
     --avg("VariableCostsInEUR") as "VariableCostsInEUR"
-    FROM {simulation}.ConventionalPlantOperator
+    FROM {schema}.ConventionalPlantOperator
     WHERE
-    "TimeStep" BETWEEN '{from_date}' AND '{to_date}'
+    "TimeStep" BETWEEN :from_date AND :to_date
     GROUP BY 1, "agent"
     ORDER BY 1) b on a.agent=b.agent and a.time=b.time
 
     GROUP BY 1, a.agent, a.technology
+    ) agents
+    GROUP BY 1
+    ORDER BY 1
+    """,
+    # storage dispatch
+    "amiris_storage": """
+    SELECT public.time_bucket('3600.000s',"TimeStep") AS "time",
+    avg("AwardedDischargeEnergyInMWH")-avg("AwardedChargeEnergyInMWH") as "storage_amiris",
+    avg("StoredEnergyInMWH")*1e3 as "soc_amiris"
+    FROM {schema}.StorageTrader
+    WHERE
+    "TimeStep" BETWEEN :from_date AND :to_date
+    GROUP BY 1
+    ORDER BY 1
+    """,
+    "assume_storage": """
+    SELECT public.time_bucket('3600.000s',"start_time") AS "time",
+    avg(accepted_volume) AS "assume_storage"
+    FROM market_orders
+    WHERE
+    start_time BETWEEN :from_date AND :to_date AND
+    unit_id like 'StorageTrader%' AND
+    simulation = :simulation
+    GROUP BY 1, unit_id, market_id
+    ORDER BY 1
+    """,
+    "assume_price": """
+    SELECT public.time_bucket('3600.000s',"product_start") AS "time",
+    avg(price) AS "assume_price"
+    FROM market_meta
+    WHERE ("simulation" LIKE :simulation) AND market_id = 'Market_1' AND
+    product_start BETWEEN :from_date AND :to_date
+    GROUP BY market_id, simulation, product_start
+    ORDER BY 1
+    """,
+    # Preisdauerlinie
+    # Ausgewählte Wochenscheiben der Preise
+    "amiris_price": """
+    SELECT public.time_bucket('3600.000s',"TimeStep") AS "time",
+    avg("ElectricityPriceInEURperMWH") as "amiris_price"
+    FROM {schema}.DayAheadMarketSingleZone
+    WHERE
+    "TimeStep" BETWEEN :from_date AND :to_date
+    GROUP BY 1
+    ORDER BY 1
+    """,
+}
+
+
+@lru_cache(maxsize=256)
+def statement(name: str, schema: str = "", pivot: str = "") -> TextClause:
+    """
+    Returns the statement of given name from the `CATALOG` - cached, so that it is compiled only once
+
+    Args:
+        name: of the statement in the catalog
+        schema: of the AMIRIS outputs of a simulation, used by statements reading these
+        pivot: columns created by `pivot_columns`, used by pivoting statements
+
+    Returns:
+        statement to be executed with its parameters bound
+
+    Raises:
+        ValueError: if the schema is no valid identifier
     """
-    amiris_dispatch = pd.read_sql(
-        text(query), engine, index_col="time", parse_dates="time"
+    return text(
+        CATALOG[name].format(schema=identifier(schema) if schema else "", pivot=pivot)
     )
-    for technology in ["nuclear", "lignite", "hard coal", "natural gas", "oil"]:
-        dd = amiris_dispatch[amiris_dispatch["technology"] == technology]
-        del dd["agent"]
-        del dd["technology"]
-        data[f"dispatch_{technology}"] = dd.resample("1h").sum()
 
-    # storage dispatch
-    query = f"""
-SELECT public.time_bucket('3600.000s',"TimeStep") AS "time",
-avg("AwardedDischargeEnergyInMWH")-avg("AwardedChargeEnergyInMWH") as "storage_amiris",
-avg("StoredEnergyInMWH")*1e3 as "soc_amiris"
-FROM {simulation}.StorageTrader
-WHERE
-  "TimeStep" BETWEEN '{from_date}' AND '{to_date}'
-GROUP BY 1
-ORDER BY 1"""
-    amiris_storage = pd.read_sql(
-        text(query), engine, index_col="time", parse_dates="time"
+
+def pivot_columns(
+    aggregate: dict[str, str],
+    filters: dict[str, dict[str, str]],
+    separator: str = "|",
+) -> tuple[str, dict[str, str]]:
+    """
+    Returns SQL select expressions that aggregate into one column per combination of filter values
+
+    Args:
+        aggregate: expressions to be aggregated by name of their column suffix, e.g. {"ASSUME": 'sum("ASSUME")'}
+        filters: filter condition values by column prefix, e.g. {"lignite": {"technology": "lignite"}}
+        separator: between column prefix and suffix
+
+    Returns:
+        comma-separated expressions like `sum("ASSUME") FILTER (WHERE technology = :pivot_0_0) AS "lignite|ASSUME"`
+        and the filter values by their parameter name
+    """
+    columns, params = [], {}
+    for i, (prefix, conditions) in enumerate(filters.items()):
+        where = []
+        for j, (column, value) in enumerate(conditions.items()):
+            params[f"pivot_{i}_{j}"] = value
+            where.append(f"{column} = :pivot_{i}_{j}")
+        for suffix, expression in aggregate.items():
+            name = f"{prefix}{separator}{suffix}" if suffix else prefix
+            # colons would be parsed as parameters by `text`
+            name = name.replace('"', '""').replace(":", r"\:")
+            columns.append(
+                f'{expression} FILTER (WHERE {" AND ".join(where)}) AS "{name}"'
+            )
+    return ",\n    ".join(columns), params
+
+
+def split_pivot(wide: pd.DataFrame, separator: str = "|") -> dict[str, pd.DataFrame]:
+    """Splits the columns of a frame created with `pivot_columns` into one frame per column prefix"""
+    wide = wide.copy()
+    wide.columns = pd.MultiIndex.from_tuples(
+        [tuple(column.split(separator, 1)) for column in wide.columns]
     )
+    return {prefix: wide[prefix] for prefix in wide.columns.unique(0)}
 
-    query = f"""
-SELECT public.time_bucket('3600.000s',"start_time") AS "time",
-  avg(accepted_volume) AS "assume_storage"
-FROM market_orders
-WHERE
-  start_time BETWEEN '{from_date}' AND '{to_date}' AND
-  unit_id like 'StorageTrader%' AND
-  simulation = '{simulation}'
-GROUP BY 1, unit_id, market_id
-ORDER BY 1
-"""
-    assume_storage = pd.read_sql(
-        text(query), engine, index_col="time", parse_dates="time"
+
+def source_fingerprint(simulation: str) -> str | None:
+    """
+    Returns a fingerprint of the source tables of given simulation - the ids of the runs that loaded its AMIRIS and
+    ASSUME outputs, which change on every load. None if a load run is unknown, e.g. of outputs loaded before load runs
+    were recorded, whose results must not be cached.
+    """
+    runs = read_load_runs(get_engine(db_uri), simulation)
+    if any(model not in runs for model in MODELS):
+        return None
+    return json.dumps(runs, sort_keys=True)
+
+
+def build_queries(
+    names: list[str], simulation: str, params: dict, chunksize: int | None
+) -> dict[str, tuple[TextClause, dict, str, int | None]]:
+    """
+    Returns the queries of given names, as expected by `read_all` - the values to pivot by are read from the database
+    only if a pivoting query is among them
+
+    Args:
+        names: of the queries in the `CATALOG`
+        simulation: name of the simulation, also the schema of its AMIRIS outputs
+        params: simulation and dates bound to all queries
+        chunksize: rows per chunk in which the pivoting unit-level queries are streamed
+
+    Returns:
+        query, its parameters, database uri and chunk size by name
+    """
+    pivots = {}
+    if any(name in PIVOTING_QUERIES for name in names):
+        technologies = read_values(statement("technologies"), params, db_uri)
+        markets = read_values(statement("markets"), params, db_uri)
+
+        market_technology_filters = {
+            f"{market}-{technology}".replace("Market_1-", ""): {
+                "market_id": market,
+                "um.technology": technology,
+            }
+            for market in markets
+            for technology in technologies
+        }
+        models = {model: f'sum("{model}")' for model in MODELS}
+        pivots = {
+            "assume_dispatch": pivot_columns(
+                {"": "sum(power)"}, market_technology_filters
+            ),
+            "vre_dispatch": pivot_columns(
+                models, {tech: {"technology": tech} for tech in technologies}
+            ),
+            "conventional_dispatch": pivot_columns(
+                models,
+                {tech: {"technology": tech} for tech in CONVENTIONAL_TECHNOLOGIES},
+            ),
+        }
+
+    queries = {}
+    for name in names:
+        if name in PIVOTING_QUERIES:
+            pivot, pivot_params = pivots[name]
+            queries[name] = (
+                statement(name, simulation, pivot),
+                params | pivot_params,
+                db_uri,
+                chunksize,
+            )
+        else:
+            queries[name] = (statement(name, simulation), params, db_uri, None)
+    return queries
+
+
+def run_queries(
+    names: list[str],
+    simulation: str,
+    params: dict,
+    chunksize: int | None,
+    workers: int,
+) -> dict[str, pd.DataFrame]:
+    """Builds and runs the queries of given names concurrently, as arguments of `build_queries` and `read_all`"""
+    return read_all(build_queries(names, simulation, params, chunksize), workers)
+
+
+def query_data(
+    simulation: str,
+    from_date: str,
+    to_date: str,
+    workers: int = QUERY_WORKERS,
+    chunksize: int | None = CHUNK_SIZE,
+):
+    """
+    Queries the dispatch and prices of a simulation together with the historical ENTSO-E data
+
+    Args:
+        simulation: name of the simulation, also the schema of its AMIRIS outputs
+        from_date: first day to query
+        to_date: last day to query
+        workers: number of queries run concurrently
+        chunksize: rows per chunk in which the unit-level queries are streamed - None reads them at once
+
+    Returns:
+        frames and series to be plotted by name - a new dictionary on each call, so that it may be modified
+
+    Raises:
+        ValueError: if the simulation is no valid SQL identifier
+    """
+    countries = ("DE_LU", "DE_AT_LU")
+    if "austria" in simulation:
+        countries = ("AT",)
+    print(simulation)
+    # cached results are read without any statement, which would check the name
+    identifier(simulation)
+    params = {"simulation": simulation, "from_date": from_date, "to_date": to_date}
+
+    # the results are identified by the statement templates - the values to pivot by follow from the source tables,
+    # which are covered by the fingerprint
+    keys = {name: (CATALOG[name], params) for name in PIVOTING_QUERIES + QUERIES}
+    keys["conventional_dispatch"] = (
+        CATALOG["conventional_dispatch"],
+        params | {"technologies": CONVENTIONAL_TECHNOLOGIES},
     )
 
+    # all queries are independent of each other, so they run concurrently - also to the historical data,
+    # which is shared by all simulations of the same countries and years
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        historical = executor.submit(
+            historical_data, countries, from_date, to_date, workers
+        )
+        run = partial(
+            run_queries,
+            simulation=simulation,
+            params=params,
+            chunksize=chunksize,
+            workers=workers,
+        )
+        results = read_cached(keys, run, simulation, source_fingerprint(simulation))
+        results |= historical.result()
+
+    data = {}
+    # markets without dispatch of a technology have no values at all
+    ddf = results["assume_dispatch"].dropna(axis=1, how="all")
+    ddf = ddf.asfreq("1h").ffill()
+
+    ddf = ddf[sorted(ddf.columns, reverse=True)]
+    ddf = ddf.fillna(0)
+    data["assume_dispatch"] = ddf * 1e3  # MW to kWh
+
+    for technology, dd in split_pivot(results["vre_dispatch"]).items():
+        if dd.notna().any(axis=None):
+            data[f"dispatch_{technology}"] = dd.resample("1h").sum()
+
+    for technology, dd in split_pivot(results["conventional_dispatch"]).items():
+        if dd.notna().any(axis=None):
+            data[f"dispatch_{technology}"] = dd.resample("1h").sum()
+
+    amiris_storage = results["amiris_storage"]
+    assume_storage = results["assume_storage"]
     data["dispatch_storage"] = pd.concat(
         [amiris_storage["storage_amiris"], assume_storage["assume_storage"]], axis=1
     )
     data["dispatch_storage"].columns = ["AMIRIS", "ASSUME"]
     data["dispatch_storage"].fillna(0, inplace=True)
 
-    # entsoe dispatch
+    data["dispatch_entsoe"] = results["entsoe_dispatch"]
 
-    query = f"""
-    SELECT
-    public.time_bucket('3600.000s',index) AS "time",
-    avg(nuclear*1e3) as nuclear,
-    avg("fossil_hard_coal"*1e3) as coal,
-    avg(("hydro_run-of-river_and_poundage"+hydro_water_reservoir)*1e3) as hydro,
-    avg(biomass*1e3) as bio,
-    avg(("fossil_coal-derived_gas"+"fossil_gas")*1e3) as "natural gas",
-    avg("fossil_brown_coal/lignite" *1e3) as lignite,
-    avg((fossil_oil+coalesce(fossil_oil_shale,0)+coalesce(fossil_peat,0))*1e3) as oil,
-    avg(("fossil_hard_coal")*1e3) as "hard coal",
-    avg(("wind_offshore")*1e3) as wind_offshore,
-    avg(("wind_onshore")*1e3) as wind_onshore,
-    avg(solar*1e3) as solar,
-    avg((hydro_pumped_storage*1e3)) as "storage",
-    avg((geothermal+other+waste)*1e3) as others
-    FROM query_generation
-    WHERE
-    index BETWEEN '{from_date}' AND '{to_date}' AND
-    country in {VALID_COUNTRY}
-    GROUP BY 1
-    ORDER BY 1
-    """
-    data["dispatch_entsoe"] = pd.read_sql(
-        query, entsoe_engine, index_col="time", parse_dates="time"
-    )
-
-    query = f"""
-    SELECT public.time_bucket('3600.000s',index) AS "time",
-    avg("0") AS "entsoe_price"
-    FROM query_day_ahead_prices
-    WHERE
-    index BETWEEN '{from_date}' AND '{to_date}' AND
-    country in {VALID_COUNTRY}
-    GROUP BY 1
-    ORDER BY 1
-    """
-    entsoe_price = pd.read_sql(
-        query, entsoe_engine, index_col="time", parse_dates="time"
-    )
+    entsoe_price = results["entsoe_price"]
     data["preis_entsoe"] = entsoe_price["entsoe_price"]
     data["preis_entsoe"].index = data["preis_entsoe"].index.tz_localize(None)
     data["preislinie_entsoe"] = entsoe_price.sort_values(
         by="entsoe_price", ascending=False
     ).reset_index()["entsoe_price"]
 
-    query = f"""SELECT public.time_bucket('3600.000s',"product_start") AS "time",
-    avg(price) AS "assume_price"
-    FROM market_meta
-    WHERE ("simulation" LIKE '{simulation}') AND market_id = 'Market_1' AND 
-    product_start BETWEEN '{from_date}' AND '{to_date}'
-    GROUP BY market_id, simulation, product_start
-    ORDER BY 1;
-    """
-
-    assume_price = pd.read_sql(query, engine, index_col="time", parse_dates="time")
+    assume_price = results["assume_price"]
     data["preis_assume"] = assume_price["assume_price"]
     data["preislinie_assume"] = assume_price.sort_values(
         by="assume_price", ascending=False
     ).reset_index()["assume_price"]
 
-    # Preisdauerlinie
-    # Ausgewählte Wochenscheiben der Preise
-
-    query = f"""
-    SELECT public.time_bucket('3600.000s',"TimeStep") AS "time",
-    avg("ElectricityPriceInEURperMWH") as "amiris_price"
-    FROM {simulation}.DayAheadMarketSingleZone
-    WHERE
-    "TimeStep" BETWEEN '{from_date}' AND '{to_date}'
-    GROUP BY 1
-    ORDER BY 1
-    """
-
-    amiris_price = pd.read_sql(query, engine, index_col="time", parse_dates="time")
+    amiris_price = results["amiris_price"]
     data["preis_amiris"] = amiris_price["amiris_price"]
     data["preislinie_amiris"] = amiris_price.sort_values(
         by="amiris_price", ascending=False
@@ -16,38 +16,58 @@ from dashboard.tools import (
     load_tab_modules,
     setup_default_tabs,
 )
+from dashboard.tools.prefetch import ChartCache
+from dashboard.tools.timing import timed
 
 DASHBOARD_TITLE = "AMIRIS Dashboard"
 
-if __name__ == "__main__":
-    # load app configuration and prepare dependent values
-    dash_cfg = DashboardConfiguration.load(pt.Path("./dashboard_config.json"))
+
+@st.cache_resource(show_spinner=False)
+def load_configuration(path: pt.Path) -> DashboardConfiguration:
+    """Loads the app configuration and prepares dependent values once per server process"""
+    dash_cfg = DashboardConfiguration.load(path)
     dash_cfg.prepare(load_tab_modules())
+    return dash_cfg
+
+
+# data, plot configurations and chart options are shared by all sessions and reruns
+load_cached_data = st.cache_resource(load_data, show_spinner=False)
+load_cached_plots_config = st.cache_resource(load_plots_config, show_spinner=False)
+load_chart_cache = st.cache_resource(ChartCache, show_spinner=False)
 
-    # load plot configurations
-    plots_cfg = load_plots_config(pt.Path("./configurations"))
+if __name__ == "__main__":
+    st.set_page_config(page_title=DASHBOARD_TITLE, layout="wide")
 
-    # init default style
-    if "style" not in st.session_state:
-        st.session_state["style"] = "light"
+    # load app configuration and prepare dependent values
+    dash_cfg = load_configuration(pt.Path("./dashboard_config.json"))
+    st.session_state["show_timings"] = dash_cfg.show_timings
+    st.session_state["chart_cache"] = load_chart_cache(
+        dash_cfg.chart_cache_mb, dash_cfg.prefetch_groups, dash_cfg.chart_cache_path
+    )
 
-    # initialize active tab
-    if "active_tab" not in st.session_state:
-        st.session_state["active_tab"] = dash_cfg.tabs[0].id
+    with timed("full app run", show=dash_cfg.show_timings):
+        # load plot configurations
+        plots_cfg = load_cached_plots_config(pt.Path("./configurations"))
 
-    # load data and metadata
-    data, metadata = load_data(dash_cfg.data_path)
+        # init default style
+        if "style" not in st.session_state:
+            st.session_state["style"] = "light"
 
-    st.set_page_config(page_title=DASHBOARD_TITLE, layout="wide")
+        # initialize active tab
+        if "active_tab" not in st.session_state:
+            st.session_state["active_tab"] = dash_cfg.tabs[0].id
+
+        # load data and metadata
+        data, metadata = load_cached_data(dash_cfg.data_path)
 
-    # create default sidebar
-    with st.sidebar:
-        create_default_sidebar(dash_cfg)
+        # create default sidebar
+        with st.sidebar:
+            create_default_sidebar(dash_cfg)
 
-    root = st.container()
+        root = st.container()
 
-    # add default tabs layout
-    with root:
-        setup_default_tabs(dash_cfg, data, metadata, plots_cfg)
-        add_reference_widget(dash_cfg)
-        add_contact_widget(dash_cfg)
+        # add default tabs layout
+        with root:
+            setup_default_tabs(dash_cfg, data, metadata, plots_cfg)
+            add_reference_widget(dash_cfg)
+            add_contact_widget(dash_cfg)
@@ -0,0 +1,114 @@
+# SPDX-FileCopyrightText: 2024 German Aerospace Center
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import pandas as pd
+import streamlit as st
+
+from dashboard.data.loaders import PartitionedData
+from dashboard.plots.lines import lines
+from dashboard.tools import update_options_with_defaults, update_options_with_overrides
+from dashboard.tools.scaling import auto_scale
+from dashboard.tools.timing import timed
+
+
+def duration_frame(curves: pd.DataFrame, group: str, years: list[int]) -> pd.DataFrame:
+    """
+    Returns the precomputed duration curves of given `group` and `years` side by side
+
+    Args:
+        curves: of all groups, years and models as stored during preprocessing
+        group: to show the duration curves of
+        years: to show the duration curves of
+
+    Returns:
+        one column per model and year, e.g. "AMIRIS 2019", indexed by the share of hours in percent
+    """
+    selected = curves[(curves["group"] == group) & curves["year"].isin(years)]
+    columns = selected["model"] + " " + selected["year"].astype(str)
+    frame = selected.assign(column=columns).pivot(
+        index="share", columns="column", values="value"
+    )
+    frame.index = (frame.index * 100).round(1)
+    return frame
+
+
+def build_options(
+    frame: pd.DataFrame, label: str, unit: str, style: str, cfg: dict
+) -> dict:
+    """
+    Builds the ECharts options of given duration curves
+
+    Args:
+        frame: duration curves as returned by `duration_frame`
+        label: of the values of the group
+        unit: of the values of the group
+        style: of the plot, i.e. "light" or "dark"
+        cfg: user overrides of the plot options
+
+    Returns:
+        ECharts options dictionary
+    """
+    data_plot, factor = auto_scale(frame)
+    options = lines(
+        data_plot, metadata={column: {"label": column} for column in frame.columns}
+    )
+    options = update_options_with_defaults(options, style)
+    options = update_options_with_overrides(options, cfg)
+    options_update = {
+        "xAxis": {"name": "share of hours in %", "nameGap": 30},
+        "yAxis": {"name": f"{label} in {factor}{unit}", "nameGap": 30},
+    }
+    return update_options_with_overrides(options, options_update)
+
+
+@st.fragment
+def create(
+    data: PartitionedData,
+    metadata: dict,
+    cfg: dict,
+):
+    from streamlit_echarts import st_echarts
+
+    with timed("tab duration", show=st.session_state.get("show_timings", False)):
+        curves = data.duration_curves
+        if curves.empty:
+            st.info(
+                "The data file holds no duration curves - run `dashboard_data_processing.py` to compute them."
+            )
+            return
+        series_names = {
+            metadata[group]["AMIRIS"]["label"]: group
+            for group in curves["group"].unique()
+        }
+
+        filter1, filter2, _ = st.columns([0.2, 0.2, 0.6])
+        with filter1:
+            selected_series = st.selectbox(
+                label="Select Column",
+                options=series_names.keys(),
+                key="duration_column",
+                disabled=(len(series_names) < 2),
+            )
+            group = series_names[selected_series]
+        with filter2:
+            years = sorted(
+                curves.loc[curves["group"] == group, "year"].unique().tolist()
+            )
+            years = st.multiselect(
+                label="Select Years",
+                options=years,
+                default=years[-1:],
+                key="duration_years",
+            )
+        if not years:
+            return
+
+        options = build_options(
+            duration_frame(curves, group, years),
+            metadata[group]["AMIRIS"]["label"],
+            metadata[group]["AMIRIS"]["unit"],
+            st.session_state["style"],
+            cfg["multiline_region_plot"],
+        )
+        st_echarts(options=options, height="500px")
@@ -0,0 +1,98 @@
+# SPDX-FileCopyrightText: 2024 German Aerospace Center
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import pandas as pd
+import streamlit as st
+
+from dashboard.data.loaders import PartitionedData
+from dashboard.tools import add_data_download_button
+from dashboard.tools.timing import timed
+
+# statistics of the precomputed metrics by their label - those without unit are dimensionless
+STATISTICS = {
+    "corr": ("Correlation", False),
+    "mae": ("MAE", True),
+    "rmse": ("RMSE", True),
+    "bias": ("Bias", True),
+    "mean": ("Mean", True),
+    "std": ("Std", True),
+    "min": ("Min", True),
+    "max": ("Max", True),
+}
+
+
+def metrics_table(
+    metrics: pd.DataFrame, group: str, years: list[int], unit: str
+) -> pd.DataFrame:
+    """
+    Returns the precomputed metrics of given `group` and `years` with one row per year and model
+
+    Args:
+        metrics: of all groups, years and models as stored during preprocessing
+        group: to show the metrics of
+        years: to show the metrics of
+        unit: of the values of the group, added to the labels of the statistics
+
+    Returns:
+        statistics of the group with labelled columns, indexed by "Year" and "Model"
+    """
+    selected = metrics[(metrics["group"] == group) & metrics["year"].isin(years)]
+    labels = {
+        statistic: f"{label} [{unit}]" if with_unit and unit else label
+        for statistic, (label, with_unit) in STATISTICS.items()
+    }
+    return (
+        selected.rename(columns={"year": "Year", "model": "Model"})
+        .set_index(["Year", "Model"])[list(labels)]
+        .rename(columns=labels)
+    )
+
+
+@st.fragment
+def create(
+    data: PartitionedData,
+    metadata: dict,
+    cfg: dict,
+):
+    with timed("tab metrics", show=st.session_state.get("show_timings", False)):
+        if data.metrics.empty:
+            st.info(
+                "The data file holds no metrics - run `dashboard_data_processing.py` to compute them."
+            )
+            return
+        groups = data.metrics["group"].unique()
+        series_names = {metadata[group]["AMIRIS"]["label"]: group for group in groups}
+
+        filter1, filter2, _ = st.columns([0.2, 0.2, 0.6])
+        with filter1:
+            selected_series = st.selectbox(
+                label="Select Column",
+                options=series_names.keys(),
+                key="metrics_column",
+                disabled=(len(series_names) < 2),
+            )
+            group = series_names[selected_series]
+        with filter2:
+            years = sorted(
+                data.metrics.loc[data.metrics["group"] == group, "year"]
+                .unique()
+                .tolist()
+            )
+            if len(years) > 1:
+                first, last = st.select_slider(
+                    label="Select Years",
+                    options=years,
+                    value=(years[0], years[-1]),
+                    key="metrics_years",
+                )
+                years = [year for year in years if first <= year <= last]
+
+        table = metrics_table(
+            data.metrics, group, years, metadata[group]["AMIRIS"]["unit"]
+        )
+        st.dataframe(table.style.format(precision=2))
+        st.caption(
+            "Errors are computed against the historical data on all hours where both are present."
+        )
+        add_data_download_button(table, file_name=f"metrics_{group}")
@@ -2,12 +2,25 @@
 #
 # SPDX-License-Identifier: Apache-2.0
 
+import copy
+import json
+from functools import partial
+
+import pandas as pd
 import streamlit as st
-from streamlit_echarts import JsCode, st_echarts
 
+from dashboard.data.loaders import PartitionedData
 from dashboard.plots.lines import lines
 from dashboard.tools import update_options_with_defaults, update_options_with_overrides
+from dashboard.tools.prefetch import ChartCache
+from dashboard.tools.rolling import WINDOWS, window_statistics
 from dashboard.tools.scaling import auto_scale
+from dashboard.tools.timing import timed
+
+# increase if `build_options` changes, to invalidate persisted chart options
+OPTIONS_VERSION = 2
+# format of the time stamps of the data, e.g. "2019-01-01 00h"
+TIME_FORMAT = "%Y-%m-%d %Hh"
 
 
 def relabel_by_model(metadata: dict[str, dict[str, str]]):
@@ -16,55 +29,206 @@ def relabel_by_model(metadata: dict[str, dict[str, str]]):
         model_metadata["label"] = model
 
 
-def create(
-    data: dict,
+def select_years(years: list[int]) -> list[int]:
+    """Lets the user select a range of the given `years` and returns the years within that range"""
+    if len(years) < 2:
+        return years
+    first, last = st.select_slider(
+        label="Select Years",
+        options=years,
+        value=(years[0], years[-1]),
+        key=1,
+    )
+    return [year for year in years if first <= year <= last]
+
+
+def _by_distance(groups: list[str], selected: str) -> list[str]:
+    """Returns given `groups` ordered by their distance to the `selected` group"""
+    position = groups.index(selected)
+    return sorted(groups, key=lambda group: abs(groups.index(group) - position))
+
+
+def _builders(
+    data: PartitionedData,
     metadata: dict,
+    groups: list[str],
+    years: list[int],
+    style: str,
     cfg: dict,
-):
-    filter1, _ = st.columns([0.2, 0.8])
-    with filter1:
-        series_names = {v["AMIRIS"]["label"]: k for k, v in metadata.items()}
-
-        selected_series = st.selectbox(
-            label="Select Column",
-            options=series_names.keys(),
-            key=0,
-            disabled=(len(series_names) < 2),
+    smoothing: str | None = None,
+) -> dict[tuple, partial]:
+    """Returns builders of the chart options of given `groups` by their cache key, in order of the given groups"""
+    return {
+        (
+            OPTIONS_VERSION,
+            group,
+            tuple(years),
+            style,
+            json.dumps(cfg, sort_keys=True),
+            data.fingerprint(group, years),
+            smoothing,
+        ): partial(
+            build_options,
+            data,
+            group,
+            tuple(years),
+            metadata[group],
+            style,
+            cfg,
+            smoothing,
         )
-        data_entry_point = series_names[selected_series]
+        for group in groups
+    }
+
 
-    data = data[data_entry_point]
-    metadata = metadata[data_entry_point]
+def smooth(data: pd.DataFrame, window: str) -> pd.DataFrame:
+    """Returns the rolling means of all columns of given data over the given `window`, e.g. "7D", ending at each hour"""
+    times = pd.to_datetime(data.index, format=TIME_FORMAT)
+    return window_statistics(data, [window], ["mean"], times=times)[window]["mean"]
+
+
+def warm_up(
+    chart_cache: ChartCache,
+    data: PartitionedData,
+    metadata: dict,
+    cfg: dict,
+    styles: list[str],
+) -> int:
+    """
+    Persists the chart options of all groups with their default year selection in given `styles`
+
+    Returns:
+        number of chart options that were built
+    """
+    built = 0
+    for style in styles:
+        for group in metadata.keys():
+            builders = _builders(
+                data,
+                metadata,
+                [group],
+                data.years(group),
+                style,
+                cfg["multiline_region_plot"],
+            )
+            for key, build in builders.items():
+                built += chart_cache.persist(key, build)
+    return built
+
+
+def build_options(
+    data: PartitionedData,
+    group: str,
+    years: tuple[int, ...],
+    metadata: dict,
+    style: str,
+    cfg: dict,
+    smoothing: str | None = None,
+) -> dict:
+    """
+    Builds the ECharts options of given `group` and `years` - does not access the session, so it may run in a
+    background thread
+
+    Args:
+        data: to load the group from
+        group: to be plotted
+        years: whose partitions are plotted
+        metadata: of the group
+        style: of the plot, i.e. "light" or "dark"
+        cfg: user overrides of the plot options
+        smoothing: window of the rolling means plotted instead of the hourly values, e.g. "7D" - None plots these
+
+    Returns:
+        ECharts options dictionary
+    """
+    from streamlit_echarts import JsCode
+
+    data = data.get(group, list(years))
+    if smoothing is not None:
+        data = smooth(data, smoothing)
+    metadata = copy.deepcopy(metadata)
 
     y_unit = metadata["AMIRIS"]["unit"]
     y_label = metadata["AMIRIS"]["label"]
 
     relabel_by_model(metadata)
-    with st.container():
-        data_plot, factor = auto_scale(data)
-        options = lines(data_plot.squeeze(), metadata=metadata)
-        options = update_options_with_defaults(options)
-        options = update_options_with_overrides(options, cfg["multiline_region_plot"])
-
-        unit_label = f"in {factor}{y_unit}"
-        toolbox_formatter = (
-            "function (params) {"
-            f"unscaled_value = params.value * {factor}; "
-            f"header = '<b> {y_label}</b>';"
-            f"series = params.seriesName + ': ' + unscaled_value.toFixed(2) + ' {y_unit}';"
-            f"return header + '<br/>' + series}}"
+    data_plot, factor = auto_scale(data)
+    options = lines(data_plot.squeeze(), metadata=metadata)
+    options = update_options_with_defaults(options, style)
+    options = update_options_with_overrides(options, cfg)
+
+    unit_label = f"in {factor}{y_unit}"
+    toolbox_formatter = (
+        "function (params) {"
+        f"unscaled_value = params.value * {factor}; "
+        f"header = '<b> {y_label}</b>';"
+        f"series = params.seriesName + ': ' + unscaled_value.toFixed(2) + ' {y_unit}';"
+        f"return header + '<br/>' + series}}"
+    )
+    options_update = {
+        "yAxis": {
+            "name": f"{y_label} {unit_label}",
+            "nameGap": 30,
+        },
+        "tooltip": {
+            "trigger": "item",
+            "formatter": JsCode(toolbox_formatter).js_code,
+        },
+    }
+    options = update_options_with_overrides(options, options_update)
+    # keep the initially visible time window independent of the number of selected years
+    options["dataZoom"][0].update({"start": 0, "end": min(100, 10 / len(years))})
+    return options
+
+
+@st.fragment
+def create(
+    data: PartitionedData,
+    metadata: dict,
+    cfg: dict,
+):
+    from streamlit_echarts import st_echarts
+
+    with timed("tab series", show=st.session_state.get("show_timings", False)):
+        filter1, filter2, filter3, _ = st.columns([0.2, 0.2, 0.2, 0.4])
+        with filter1:
+            series_names = {v["AMIRIS"]["label"]: k for k, v in metadata.items()}
+
+            selected_series = st.selectbox(
+                label="Select Column",
+                options=series_names.keys(),
+                key=0,
+                disabled=(len(series_names) < 2),
+            )
+            data_entry_point = series_names[selected_series]
+        with filter2:
+            selected_years = select_years(data.years(data_entry_point))
+        with filter3:
+            smoothing = st.selectbox(
+                label="Smoothing",
+                options=[None, *WINDOWS],
+                format_func=lambda window: (
+                    "none" if window is None else f"{window} rolling mean"
+                ),
+                key="smoothing",
+            )
+
+        chart_cache: ChartCache = st.session_state["chart_cache"]
+        builders = _builders(
+            data,
+            metadata,
+            _by_distance(list(series_names.values()), data_entry_point),
+            selected_years,
+            st.session_state["style"],
+            cfg["multiline_region_plot"],
+            smoothing,
         )
-        options_update = {
-            "yAxis": {
-                "name": f"{y_label} {unit_label}",
-                "nameGap": 30,
-            },
-            "tooltip": {
-                "trigger": "item",
-                "formatter": JsCode(toolbox_formatter).js_code,
-            },
-        }
-        options = update_options_with_overrides(options, options_update)
-        options["dataZoom"][0].update({"start": 0, "end": 2})
-
-        st_echarts(options=options, height="500px")
+
+        with st.container():
+            key, build = next(iter(builders.items()))
+            with timed("series chart options"):
+                options = chart_cache.get_or_build(key, build)
+            st_echarts(options=options, height="500px")
+
+        # warm the cache for the other groups, starting with the neighbours of the selected one
+        chart_cache.prefetch(dict(list(builders.items())[1:]))
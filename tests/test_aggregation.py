@@ -0,0 +1,75 @@
+# SPDX-FileCopyrightText: 2024 German Aerospace Center
+#
+# SPDX-License-Identifier: Apache-2.0
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from dashboard.data import Column
+from dashboard.data.amiris_outputs import hourly_means
+
+VALUES = ["AwardedEnergyInMWH", "OfferedEnergyInMWH"]
+
+
+@pytest.fixture
+def output_file(tmp_path):
+    """An AMIRIS output file of three agents at quarter hours, whose columns are written at different time steps"""
+    rng = np.random.default_rng(0)
+    times = pd.date_range("2019-01-01", periods=48, freq="15min")
+    data = pd.DataFrame(
+        {
+            "AgentId": np.tile([1, 2, 3], len(times)),
+            "TimeStep": np.repeat(times.strftime("%Y-%m-%d_%H:%M:%S"), 3),
+            VALUES[0]: rng.uniform(0, 100, 3 * len(times)).round(1),
+            VALUES[1]: rng.uniform(0, 100, 3 * len(times)).round(1),
+        }
+    )
+    data.loc[rng.random(len(data)) < 0.3, VALUES[0]] = np.nan
+    data.loc[rng.random(len(data)) < 0.5, VALUES[1]] = np.nan
+    # the second value of agent 3 is never written in the first hour
+    data.loc[(data["AgentId"] == 3) & (data.index < 12), VALUES[1]] = np.nan
+    path = tmp_path / "ConventionalPlantOperator.csv"
+    data.to_csv(path, sep=";", index=False)
+    return path
+
+
+def expected_means(path) -> pd.DataFrame:
+    data = pd.read_csv(path, sep=";")
+    times = pd.to_datetime(data.pop("TimeStep"), format="%Y-%m-%d_%H:%M:%S")
+    data["TimeStamp"] = times.dt.floor("h").dt.strftime("%Y-%m-%d %Hh")
+    return data.groupby(["TimeStamp", "AgentId"])[VALUES].mean()
+
+
+@pytest.mark.parametrize("chunksize", [7, 1000])
+def test_means_match_groupby(output_file, chunksize):
+    means = hourly_means(output_file, VALUES, chunksize=chunksize)
+    pd.testing.assert_frame_equal(
+        means.sort_index(), expected_means(output_file), check_index_type=False
+    )
+
+
+def test_single_empty_cell(tmp_path):
+    path = tmp_path / "DayAheadMarketSingleZone.csv"
+    path.write_text(
+        "AgentId;TimeStep;Price\n"
+        "1;2019-01-01_00:00:00;10\n"
+        "1;2019-01-01_00:15:00;\n"
+        "1;2019-01-01_00:30:00;20\n"
+    )
+    means = hourly_means(path, ["Price"])
+    assert means["Price"].tolist() == [15.0]
+
+
+@pytest.mark.parametrize("chunksize", [7, 1000])
+def test_group_sums_match_groupby(output_file, chunksize):
+    technologies = {1: Column.NUCLEAR, 2: Column.NUCLEAR, 3: Column.LIGNITE}
+    sums = hourly_means(output_file, VALUES, technologies, chunksize=chunksize)
+    means = expected_means(output_file)
+    groups = means.index.get_level_values("AgentId").map(
+        lambda agent: technologies[agent].name
+    )
+    expected = means.groupby([means.index.get_level_values(0), groups]).sum()
+    pd.testing.assert_frame_equal(
+        sums.sort_index(), expected, check_index_type=False, check_names=False
+    )